@@ -1,11 +1,52 @@
 # This is a dummy commit for testing CodeRabbit
-from flask import Flask
+import time
+import logging
+from flask import Flask, g, request
 from flask_login import LoginManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config.config import Config
 
+def init_logging(config_class):
+    """Configure the root logger once, at the configured level."""
+    logging.basicConfig(level=config_class.LOG_LEVEL, format=config_class.LOG_FORMAT)
+    logging.getLogger().setLevel(config_class.LOG_LEVEL)
+
+def init_request_metrics(app):
+    """Time every request and count it by endpoint and status."""
+    from app.metrics import REQUEST_DURATION, REQUESTS
+    
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+    
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # Label by endpoint rather than path to keep the number of series bounded
+            labels = {
+                'method': request.method,
+                'endpoint': request.endpoint or 'unmatched',
+                'status': response.status_code
+            }
+            REQUEST_DURATION.observe(time.perf_counter() - started, **labels)
+            REQUESTS.inc(**labels)
+        return response
+
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    init_logging(config_class)
+    
+    # Take the client address from the proxy's headers, so per-client limits see real clients
+    if config_class.PROXY_FIX_HOPS:
+        hops = config_class.PROXY_FIX_HOPS
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+    init_request_metrics(app)
+    
+    # Stream uploads to size-limited temp files instead of buffering them
+    from app.uploads import UploadRequest
+    app.request_class = UploadRequest
     
     # Initialize extensions
     login_manager = LoginManager()
@@ -15,9 +56,16 @@ def create_app(config_class=Config):
     # Initialize config
     config_class.init_app()
     
-    # Import and initialize models
+    # Import and initialize models; the configured admin is the first account
     from app.models import User, init_login_manager
+    from app.users import user_store
     init_login_manager(login_manager)
+    user_store.ensure_admin(config_class.ADMIN_USERNAME, config_class.ADMIN_PASSWORD)
+    
+    from app.cli import users_cli, site_cli, content_cli
+    app.cli.add_command(users_cli)
+    app.cli.add_command(site_cli)
+    app.cli.add_command(content_cli)
     
     # Register blueprints
     from app.routes.auth import auth as auth_blueprint
@@ -29,4 +77,23 @@ def create_app(config_class=Config):
     from app.routes.media import media as media_blueprint
     app.register_blueprint(media_blueprint)
     
+    from app.routes.jobs import jobs as jobs_blueprint
+    app.register_blueprint(jobs_blueprint)
+    
+    from app.routes.metrics import metrics as metrics_blueprint
+    app.register_blueprint(metrics_blueprint)
+    
+    from app.routes.drafts import drafts as drafts_blueprint
+    app.register_blueprint(drafts_blueprint)
+    
+    from app.routes.transfer import transfer as transfer_blueprint
+    app.register_blueprint(transfer_blueprint)
+    
+    # Publish scheduled drafts in the background; workers forked after this
+    # start their own ticker on their first request
+    if config_class.SCHEDULER_ENABLED:
+        from app.scheduler import scheduler
+        scheduler.start()
+        app.before_request(scheduler.start)
+    
     return app 
\ No newline at end of file
@@ -0,0 +1,63 @@
+import os
+import json
+import hashlib
+import threading
+from config.config import Config
+from app.fileio import write_json
+
+def git_blob_sha(data):
+    """Compute the git blob SHA-1 of a byte string, as GitHub would."""
+    digest = hashlib.sha1()
+    digest.update(f"blob {len(data)}\0".encode('ascii'))
+    digest.update(data)
+    return digest.hexdigest()
+
+class BlobHashCache:
+    """
+    Cache of git blob SHAs for files under BLOG_PATH.
+    Entries are keyed by relative path and validated against mtime and size,
+    so unchanged files are never re-read to decide whether they need uploading.
+    """
+    def __init__(self, root_path, cache_file):
+        self.root_path = root_path
+        self.cache_file = cache_file
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def sha_for(self, relative_path):
+        """Return the blob SHA of a file, hashing it only if it changed."""
+        with self._lock:
+            self._load()
+            stat = os.stat(os.path.join(self.root_path, relative_path))
+            cached = self._entries.get(relative_path)
+            if cached and cached['mtime'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+                return cached['sha']
+            with open(os.path.join(self.root_path, relative_path), 'rb') as f:
+                sha = git_blob_sha(f.read())
+            self._entries[relative_path] = {
+                'mtime': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'sha': sha
+            }
+            self._dirty = True
+            return sha
+
+    def save(self):
+        """Persist new hashes; written atomically and only when something changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            write_json(self.cache_file, self._entries)
+            self._dirty = False
+
+blob_hashes = BlobHashCache(Config.BLOG_PATH, Config.BLOB_HASH_CACHE_FILE)
@@ -0,0 +1,107 @@
+import click
+from flask.cli import AppGroup
+from app.users import user_store
+
+users_cli = AppGroup('users', help='Manage CMS accounts.')
+
+@users_cli.command('add')
+@click.argument('username')
+@click.password_option()
+@click.option('--admin', is_flag=True, help='Give the account admin rights.')
+def add_user(username, password, admin):
+    """Create an account."""
+    if not user_store.add(username, password, is_admin=admin):
+        raise click.ClickException(f"User {username} already exists")
+    click.echo(f"Added user {username}")
+
+@users_cli.command('set-password')
+@click.argument('username')
+@click.password_option()
+def set_password(username, password):
+    """Change an account's password; the only way to rotate the admin password after the first start."""
+    if not user_store.set_password(username, password):
+        raise click.ClickException(f"No such user: {username}")
+    click.echo(f"Password changed for {username}")
+
+@users_cli.command('delete')
+@click.argument('username')
+def delete_user(username):
+    """Delete an account."""
+    if not user_store.delete(username):
+        raise click.ClickException(f"No such user: {username}")
+    click.echo(f"Deleted user {username}")
+
+@users_cli.command('list')
+def list_users():
+    """List accounts."""
+    for username, is_admin in user_store.list_users():
+        click.echo(f"{username}{' (admin)' if is_admin else ''}")
+
+site_cli = AppGroup('site', help='Render the blog to static HTML.')
+
+@site_cli.command('build')
+@click.option('--full', is_flag=True, help='Ignore the manifest and render every page.')
+@click.option('--workers', type=int, default=None, help='Render processes (default: one per core).')
+def build_site(full, workers):
+    """Render changed posts, archives and the feed."""
+    from app.site_builder import site_builder
+    stats = site_builder.build(full=full, workers=workers)
+    click.echo(f"{stats['posts']} posts, {stats['changed_posts']} changed: rendered {stats['pages']} pages "
+               f"and {stats['listings']} listings, removed {stats['removed']} in {stats['seconds']}s "
+               f"into {site_builder.output_path}")
+
+@site_cli.command('serve')
+@click.option('--port', type=int, default=4000)
+@click.option('--build/--no-build', default=True, help='Build before serving.')
+def serve_site(port, build):
+    """Serve the rendered site on localhost."""
+    import functools
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+    from app.site_builder import site_builder
+    if build:
+        site_builder.build()
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=site_builder.output_path)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    click.echo(f"Serving {site_builder.output_path} on http://127.0.0.1:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+content_cli = AppGroup('content', help='Import and export posts, drafts and images.')
+
+@content_cli.command('import')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'import_format', type=click.Choice(['tar', 'zip', 'ndjson']), default=None,
+              help='Input format (default: from the file extension).')
+@click.option('--overwrite', is_flag=True, help='Replace files that already exist.')
+@click.option('--push/--no-push', default=True, help='Commit the imported files in one commit.')
+def import_content(source, import_format, overwrite, push):
+    """Import a tar/zip archive or NDJSON file ('-' reads stdin)."""
+    from datetime import datetime
+    from app.transfer import BlogImporter
+    from app.utils import push_paths
+    if import_format is None:
+        name = source.name.lower()
+        import_format = 'zip' if name.endswith('.zip') else 'ndjson' if name.endswith(('.ndjson', '.jsonl')) else 'tar'
+    importer = BlogImporter(overwrite=overwrite)
+    summary = importer.run(source, import_format)
+    click.echo(f"Imported {summary['posts']} posts, {summary['drafts']} drafts and {summary['images']} images; "
+               f"skipped {len(summary['skipped'])}, {len(summary['errors'])} errors")
+    for problem in summary['skipped'] + summary['errors']:
+        click.echo(f"  {problem['name']}: {problem.get('reason') or problem.get('error')}", err=True)
+    if push and importer.paths:
+        message = f"Import {len(importer.paths)} files - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        success, result = push_paths(importer.paths, message)
+        click.echo(result)
+        if not success:
+            raise SystemExit(1)
+
+@content_cli.command('export')
+@click.argument('destination', type=click.File('wb'))
+@click.option('--format', 'export_format', type=click.Choice(['tar', 'zip']), default='tar')
+def export_content(destination, export_format):
+    """Write a tar.gz or zip backup ('-' writes to stdout)."""
+    from app.transfer import stream_export
+    for chunk in stream_export(export_format):
+        destination.write(chunk)
@@ -0,0 +1,97 @@
+import os
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime
+from config.config import Config
+from app.jobs import create_job, update_job, prune_jobs
+from app.utils import push_paths
+
+logger = logging.getLogger(__name__)
+
+class CommitQueue:
+    """
+    Debounced background committer.
+    Changes submitted within the debounce window are coalesced into a single
+    GitHub commit pushed from a worker thread; each submission gets a job id
+    whose status can be polled while the push is in flight.
+    """
+    def __init__(self, window):
+        self.window = window
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._jobs = []
+        self._first_change = None
+        self._thread = None
+        self._pid = None
+        atexit.register(self.flush)
+
+    def _ensure_worker(self):
+        """Start the worker thread lazily, and again after a fork."""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='commit-queue', daemon=True)
+        self._thread.start()
+
+    def submit(self, relative_paths, description):
+        """Queue paths (relative to BLOG_PATH) for the next commit and return a job id."""
+        job_id = create_job('commit', description=description, paths=list(relative_paths))
+        if not Config.COMMIT_QUEUE_ENABLED:
+            self._push([job_id], {path: description for path in relative_paths}, [description])
+            return job_id
+        with self._cond:
+            for path in relative_paths:
+                self._pending[path] = description
+            self._jobs.append((job_id, description))
+            if self._first_change is None:
+                self._first_change = time.monotonic()
+            self._ensure_worker()
+            self._cond.notify()
+        return job_id
+
+    def _take_batch(self):
+        """Detach everything queued so far; call with the condition held."""
+        batch = self._jobs, self._pending
+        self._jobs, self._pending, self._first_change = [], {}, None
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._jobs:
+                    self._cond.wait()
+                # Debounce: let changes accumulate until the window after the first one closes
+                deadline = self._first_change + self.window
+                remaining = deadline - time.monotonic()
+                while remaining > 0 and self._jobs:
+                    self._cond.wait(remaining)
+                    remaining = deadline - time.monotonic()
+                jobs, pending = self._take_batch()
+            if jobs:
+                self._push([job_id for job_id, _ in jobs], pending, [description for _, description in jobs])
+                prune_jobs()
+
+    def flush(self):
+        """Push whatever is queued right now, e.g. before the worker exits."""
+        with self._cond:
+            jobs, pending = self._take_batch()
+        if jobs:
+            self._push([job_id for job_id, _ in jobs], pending, [description for _, description in jobs])
+
+    def _push(self, job_ids, pending, descriptions):
+        for job_id in job_ids:
+            update_job(job_id, status='running')
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if len(descriptions) == 1:
+            message = f"{descriptions[0]} - {timestamp}"
+        else:
+            message = f"Update blog content - {timestamp}\n\n"
+            message += '\n'.join(f"- {description}" for description in descriptions)
+        logger.info("Pushing %d paths for %d jobs", len(pending), len(job_ids))
+        success, result = push_paths(list(pending), message)
+        for job_id in job_ids:
+            update_job(job_id, status='succeeded' if success else 'failed', message=result)
+
+commit_queue = CommitQueue(Config.COMMIT_DEBOUNCE_SECONDS)
@@ -0,0 +1,26 @@
+import os
+import sqlite3
+import threading
+
+class ThreadConnections:
+    """
+    One SQLite connection per thread for a database file under .cms.
+    Connections are opened in WAL mode with the schema created on first use,
+    and opened again in a forked worker rather than shared with the parent.
+    """
+    def __init__(self, db_path, schema):
+        self.db_path = db_path
+        self.schema = schema
+        self._local = threading.local()
+
+    def get(self):
+        """Return this thread's connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=10)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(self.schema)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
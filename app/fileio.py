@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from config.config import Config
+
+def content_version(path):
+    """Return the SHA-256 of a file's content, or None if it does not exist."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+def read_versioned(path):
+    """Read a text file and return (text, version) taken from the same bytes."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return data.decode('utf-8'), hashlib.sha256(data).hexdigest()
+
+@contextmanager
+def _atomic_replace(path):
+    """
+    Yield a binary file that replaces path once the block completes: a hidden
+    temp file in the same directory, unique to this call, flushed to disk and
+    then renamed over the target.
+    """
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _stamp(stat):
+    # Every atomic write creates a new inode, so a rewrite is noticed even within one mtime tick
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def atomic_write(path, data):
+    """Replace a file's content so readers see either the old or the new version."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    with _atomic_replace(path) as f:
+        f.write(data)
+
+def atomic_copy(source, path):
+    """Copy a file over path atomically, streaming it rather than reading it into memory."""
+    with open(source, 'rb') as src, _atomic_replace(path) as f:
+        shutil.copyfileobj(src, f, 1024 * 1024)
+
+def write_json(path, data):
+    """
+    Write a JSON sidecar atomically, creating its directory, and return the
+    stamp of the new file (see read_json_if_changed).
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write(path, json.dumps(data))
+    return _stamp(os.stat(path))
+
+def read_json_if_changed(path, stamp):
+    """
+    Reload a JSON sidecar if another worker has rewritten it since stamp.
+    Returns (data, stamp of the file read); data is None when the file is
+    missing, unchanged or unreadable, and the caller keeps what it has.
+    """
+    try:
+        current = _stamp(os.stat(path))
+    except FileNotFoundError:
+        return None, stamp
+    if current == stamp:
+        return None, stamp
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f), current
+    except (OSError, ValueError):
+        return None, stamp
+
+def _cooperative():
+    """Whether gevent has patched the standard library (gevent workers)."""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('time')
+
+def _flock_cooperatively(fd):
+    """
+    Wait for a lock by polling, yielding to other greenlets in between. A
+    blocking flock would stop the whole worker, including the greenlet in this
+    process that holds the lock and would release it.
+    """
+    delay = 0.001
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+@contextmanager
+def file_lock(name, blocking=True):
+    """
+    Hold an exclusive lock shared by every worker process on this host.
+    Yields True once acquired; with blocking=False it yields False instead of
+    waiting when another process holds the lock.
+    """
+    os.makedirs(Config.LOCKS_PATH, exist_ok=True)
+    lock_path = os.path.join(Config.LOCKS_PATH, f'{name}.lock')
+    with open(lock_path, 'a') as f:
+        try:
+            if blocking and _cooperative():
+                _flock_cooperatively(f.fileno())
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def post_lock(filename):
+    """Lock guarding reads-then-writes of one post."""
+    return file_lock(f'post-{filename}')
+
+def image_lock(stem):
+    """Lock guarding the choice of a stored image name and its creation."""
+    return file_lock(f'image-{stem}')
@@ -0,0 +1,345 @@
+import os
+import time
+import random
+import logging
+import subprocess
+from config.config import Config
+from app.blob_cache import blob_hashes
+from app.fileio import atomic_write, file_lock
+from app.http_cache import generations
+from app.metrics import observe, span
+
+logger = logging.getLogger(__name__)
+
+NULL_SHA = '0' * 40
+
+class GitError(Exception):
+    """A git command failed."""
+
+class PushError(GitError):
+    """Changes were committed locally, but the branch could not be pushed."""
+
+class LocalGitBackend:
+    """
+    Storage backend that commits in the local checkout with git plumbing and
+    pushes the branch to its remote in a single packfile.
+    Commits are built in a private index (hash-object, update-index, write-tree,
+    commit-tree) and the branch is moved with a compare-and-swap update-ref, so
+    the checkout's HEAD is never rewritten behind its back. Workers on the host
+    take turns through a file lock. Commits are made even when the remote is
+    unreachable (the call then raises PushError) and go out with the next
+    successful push; if the remote moved, it is fetched and our changes are
+    re-applied on top of it as a merge commit, keeping our version of paths both
+    sides changed (logged and counted as conflicts).
+    """
+    name = 'git'
+    not_configured_message = "BLOG_PATH is not a git checkout"
+
+    def __init__(self, repo_path, remote='origin', branch=None, push=True):
+        self.repo_path = repo_path
+        self.remote = remote
+        self.push_enabled = push and bool(remote)
+        self._branch = branch
+        self._git_dir = None
+        self._tree_cache = {'commit': None, 'paths': {}}
+        self.counters = {'commits': 0, 'pushes': 0, 'push_failures': 0, 'rebuilds': 0, 'conflicts': 0}
+        self.last_push_error = None
+
+    def _git(self, *args, input=None, env=None, check=True):
+        """Run a git command in the checkout and return the completed process (bytes)."""
+        started = time.perf_counter()
+        result = subprocess.run(
+            ['git', *args],
+            cwd=self.repo_path,
+            input=input,
+            env=dict(os.environ, **env) if env else None,
+            capture_output=True
+        )
+        observe(f'git_{args[0]}', time.perf_counter() - started)
+        if check and result.returncode != 0:
+            raise GitError(f"git {args[0]} failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return result
+
+    def _output(self, *args, **kwargs):
+        return self._git(*args, **kwargs).stdout.decode('utf-8').strip()
+
+    @property
+    def git_dir(self):
+        if self._git_dir is None:
+            self._git_dir = self._output('rev-parse', '--absolute-git-dir')
+            self._exclude_state_dir()
+        return self._git_dir
+
+    def _exclude_state_dir(self):
+        """Keep the CMS state directory out of `git status` in the checkout."""
+        state_dir = os.path.relpath(Config.CMS_STATE_PATH, self.repo_path)
+        if state_dir.startswith('..'):
+            return
+        pattern = f"/{state_dir.replace(os.sep, '/')}/"
+        exclude_file = os.path.join(self._git_dir, 'info', 'exclude')
+        try:
+            with open(exclude_file, 'r', encoding='utf-8') as f:
+                if pattern in f.read().splitlines():
+                    return
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(exclude_file), exist_ok=True)
+        with open(exclude_file, 'a', encoding='utf-8') as f:
+            f.write(f"{pattern}\n")
+
+    @property
+    def configured(self):
+        try:
+            return bool(self.git_dir)
+        except (GitError, OSError):
+            return False
+
+    @property
+    def branch(self):
+        if self._branch is None:
+            self._branch = self._output('symbolic-ref', '--short', 'HEAD')
+        return self._branch
+
+    @property
+    def _index_env(self):
+        """Environment selecting the backend's private index file."""
+        return {'GIT_INDEX_FILE': os.path.join(self.git_dir, 'cms-index')}
+
+    @property
+    def _commit_env(self):
+        return {
+            'GIT_AUTHOR_NAME': Config.GIT_AUTHOR_NAME,
+            'GIT_AUTHOR_EMAIL': Config.GIT_AUTHOR_EMAIL,
+            'GIT_COMMITTER_NAME': Config.GIT_AUTHOR_NAME,
+            'GIT_COMMITTER_EMAIL': Config.GIT_AUTHOR_EMAIL
+        }
+
+    def _head(self):
+        """Return the branch's commit SHA, or None before the first commit."""
+        result = self._git('rev-parse', '--verify', '--quiet', f'refs/heads/{self.branch}^{{commit}}', check=False)
+        return result.stdout.decode('ascii').strip() or None
+
+    def _branch_checked_out(self):
+        result = self._git('symbolic-ref', '--quiet', 'HEAD', check=False)
+        return result.stdout.decode('utf-8').strip() == f'refs/heads/{self.branch}'
+
+    def _tree_paths(self, commit):
+        """Return the path -> blob SHA map of a commit's tree, cached for the last commit."""
+        if commit is None:
+            return {}
+        if self._tree_cache['commit'] == commit:
+            return self._tree_cache['paths']
+        paths = {}
+        for record in self._git('ls-tree', '-r', '-z', '--full-tree', commit).stdout.split(b'\0'):
+            if not record:
+                continue
+            meta, path = record.split(b'\t', 1)
+            _, kind, sha = meta.decode('ascii').split()
+            if kind == 'blob':
+                paths[path.decode('utf-8')] = sha
+        self._tree_cache = {'commit': commit, 'paths': paths}
+        return paths
+
+    def _diff(self, old, new):
+        """Return path -> new blob SHA (None when deleted) for files changed between commits."""
+        output = self._git('diff-tree', '-r', '-z', '--no-renames', '--no-commit-id', old, new).stdout
+        fields = output.split(b'\0')
+        changes = {}
+        for meta, path in zip(fields[0::2], fields[1::2]):
+            if not meta:
+                continue
+            _, _, _, new_sha, status = meta.decode('ascii').lstrip(':').split()
+            changes[path.decode('utf-8')] = None if status == 'D' else new_sha
+        return changes
+
+    def _write_blobs(self, file_paths):
+        """Store files as blobs in the object database and return their SHAs."""
+        if not file_paths:
+            return []
+        result = self._git('hash-object', '-w', '--no-filters', '--stdin-paths',
+                           input='\n'.join(file_paths).encode('utf-8'))
+        return result.stdout.decode('ascii').split()
+
+    def _index_info(self, entries):
+        records = []
+        for path, sha in sorted(entries.items()):
+            if sha is None:
+                records.append(f"0 {NULL_SHA}\t{path}")
+            else:
+                records.append(f"100644 {sha}\t{path}")
+        return ('\0'.join(records) + '\0').encode('utf-8')
+
+    def _commit(self, base, entries, message, parents, expected):
+        """
+        Commit base's tree with entries (path -> blob SHA, None to delete) applied
+        and move the branch from expected to the new commit.
+        """
+        env = self._index_env
+        if base:
+            self._git('read-tree', base, env=env)
+        else:
+            self._git('read-tree', '--empty', env=env)
+        self._git('update-index', '-z', '--index-info', input=self._index_info(entries), env=env)
+        tree = self._output('write-tree', env=env)
+        parent_args = [arg for parent in parents for arg in ('-p', parent)]
+        commit = self._output('commit-tree', tree, *parent_args, input=message.encode('utf-8'),
+                              env=self._commit_env)
+        self._git('update-ref', '-m', 'cms: commit', f'refs/heads/{self.branch}', commit, expected or NULL_SHA)
+        self.counters['commits'] += 1
+        logger.debug("Created commit with SHA: %s", commit)
+
+        if self._branch_checked_out():
+            # Keep the checkout's own index in step so `git status` stays clean
+            self._git('update-index', '-z', '--index-info', input=self._index_info(entries))
+        return commit
+
+    def _checkout_paths(self, changes, previous):
+        """
+        Bring files changed on the remote into the working tree and index.
+        A file that no longer matches the previous head's blob holds a save that
+        is not committed yet; it is left alone (and reported) so the pending
+        commit is not lost, and goes out on top of the remote version.
+        """
+        if not changes or not self._branch_checked_out():
+            return
+        committed = self._tree_paths(previous)
+        applied = {}
+        for path, sha in changes.items():
+            relative_path = path.replace('/', os.sep)
+            file_path = os.path.join(self.repo_path, relative_path)
+            local_sha = blob_hashes.sha_for(relative_path) if os.path.isfile(file_path) else None
+            if local_sha not in (committed.get(path), sha):
+                logger.warning("Keeping uncommitted local changes to %s over the remote version", path)
+                continue
+            if sha is None:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            elif local_sha != sha:
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                atomic_write(file_path, self._git('cat-file', 'blob', sha).stdout)
+            applied[path] = sha
+        blob_hashes.save()
+        if applied:
+            self._git('update-index', '-z', '--index-info', input=self._index_info(applied))
+            generations.bump('posts', 'drafts', 'images')
+
+    def _apply(self, entries_for, message):
+        """
+        Commit the entries built from the head tree and push; returns the number of
+        changed paths. Raises PushError when the commit (or an earlier one) stays local.
+        """
+        with file_lock('git-storage'):
+            head = self._head()
+            entries = entries_for(self._tree_paths(head))
+            if entries:
+                commit_message = message(sorted(entries)) if callable(message) else message
+                self._commit(head, entries, commit_message, [head] if head else [], head)
+        if not self.push():
+            raise PushError(f"committed locally, not pushed: {self.last_push_error}")
+        return len(entries)
+
+    def commit_paths(self, relative_paths, message):
+        """
+        Commit the paths (relative to BLOG_PATH) that differ from the branch head,
+        then push. Paths that no longer exist locally are deleted.
+        Returns the number of changed paths; 0 means the branch was already up to date.
+        """
+        def entries_for(tree):
+            entries = {}
+            writes = []
+            for relative_path in set(relative_paths):
+                git_path = relative_path.replace(os.sep, '/')
+                file_path = os.path.join(self.repo_path, relative_path)
+                if os.path.isfile(file_path):
+                    if tree.get(git_path) != blob_hashes.sha_for(relative_path):
+                        writes.append((git_path, file_path))
+                elif git_path in tree:
+                    entries[git_path] = None
+            blob_hashes.save()
+            shas = self._write_blobs([file_path for _, file_path in writes])
+            entries.update(zip([git_path for git_path, _ in writes], shas))
+            return entries
+
+        with span('commit_paths'):
+            return self._apply(entries_for, message)
+
+    def delete_paths(self, relative_paths, message):
+        """
+        Delete paths (relative to BLOG_PATH) from the branch in one commit, then push.
+        The message may be a callable taking the deleted git paths.
+        Returns the number of deleted paths.
+        """
+        requested = {path.replace(os.sep, '/') for path in relative_paths}
+        with span('delete_paths'):
+            return self._apply(lambda tree: {path: None for path in requested if path in tree}, message)
+
+    def _integrate_remote(self):
+        """Fetch the remote branch and put the local commits on top of it."""
+        self._git('fetch', '--no-tags', self.remote, f'refs/heads/{self.branch}')
+        remote_head = self._output('rev-parse', 'FETCH_HEAD^{commit}')
+        local = self._head()
+        if local is None:
+            self._git('update-ref', f'refs/heads/{self.branch}', remote_head, NULL_SHA)
+            self._checkout_paths(dict(self._tree_paths(remote_head)), None)
+            return
+        if self._git('merge-base', '--is-ancestor', remote_head, local, check=False).returncode == 0:
+            return
+        if self._git('merge-base', '--is-ancestor', local, remote_head, check=False).returncode == 0:
+            # Nothing of ours is missing remotely: fast-forward
+            self._git('update-ref', f'refs/heads/{self.branch}', remote_head, local)
+            self._checkout_paths(self._diff(local, remote_head), local)
+            return
+
+        # Both sides moved: apply our changes since the fork point to the remote tree
+        base = self._output('merge-base', local, remote_head)
+        ours = self._diff(base, local)
+        theirs = self._diff(base, remote_head)
+        conflicts = sorted(path for path in ours if path in theirs and ours[path] != theirs[path])
+        if conflicts:
+            # Both sides changed these paths; the CMS version wins
+            self.counters['conflicts'] += len(conflicts)
+            logger.warning("Kept the CMS version of %d paths also changed on %s/%s: %s",
+                           len(conflicts), self.remote, self.branch, ', '.join(conflicts))
+        message = f"Merge {self.remote}/{self.branch} into CMS changes"
+        self._commit(remote_head, ours, message, [local, remote_head], local)
+        self._checkout_paths({path: sha for path, sha in theirs.items() if path not in ours}, local)
+        self.counters['rebuilds'] += 1
+
+    def push(self):
+        """
+        Push the branch to the remote; returns whether the remote is up to date.
+        A rejected (non-fast-forward) push is integrated and retried up to
+        GIT_PUSH_RETRIES times; other failures such as no network leave the
+        commits to go out with the next push.
+        """
+        if not self.push_enabled:
+            return True
+        for attempt in range(Config.GIT_PUSH_RETRIES + 1):
+            head = self._head()
+            if head is None:
+                return True
+            result = self._git('push', '--porcelain', self.remote, f'{head}:refs/heads/{self.branch}', check=False)
+            if result.returncode == 0:
+                self.counters['pushes'] += 1
+                self.last_push_error = None
+                return True
+            output = (result.stdout + result.stderr).decode('utf-8', 'replace')
+            if '[rejected]' not in output or attempt == Config.GIT_PUSH_RETRIES:
+                break
+            logger.info("Remote %s moved; integrating before pushing again", self.remote)
+            with file_lock('git-storage'):
+                self._integrate_remote()
+            time.sleep(random.uniform(0, Config.GITHUB_REF_RETRY_BASE_SECONDS * (2 ** attempt)))
+        self.counters['push_failures'] += 1
+        self.last_push_error = output.strip()
+        logger.warning("Push to %s failed; commits stay local until the next push: %s",
+                       self.remote, self.last_push_error)
+        return False
+
+    def stats(self):
+        return dict(
+            self.counters,
+            backend=self.name,
+            branch=self._branch,
+            remote=self.remote if self.push_enabled else None,
+            last_push_error=self.last_push_error
+        )
@@ -0,0 +1,266 @@
+import os
+import time
+import base64
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from config.config import Config
+from app.metrics import GITHUB_REQUEST_DURATION
+
+logger = logging.getLogger(__name__)
+
+class StaleRefError(Exception):
+    """The branch moved since its head was read, so the update was not a fast-forward."""
+
+class GitHubGateway:
+    """
+    Shared access point for the blog repository on GitHub.
+    Holds one pooled keep-alive session (with retries) per process, caches the
+    repository object, default branch and last known tree listing, and records
+    the latency of every API call by operation.
+    Blob uploads run on a bounded thread pool and back off when GitHub reports
+    that the rate limit is exhausted. requests and PyGithub are imported on the
+    first API call rather than at startup.
+    """
+    def __init__(self, token, owner, repo_name, api_url):
+        self.token = token
+        self.owner = owner
+        self.repo_name = repo_name
+        self.api_url = api_url.rstrip('/')
+        self._lock = threading.RLock()
+        self._pid = None
+        self._session = None
+        self._repo = None
+        self._default_branch = None
+        self._commit_trees = {}
+        self._tree_paths = {'sha': None, 'paths': {}}
+        self._latencies = defaultdict(lambda: deque(maxlen=Config.GITHUB_LATENCY_SAMPLES))
+        self.rate_limit = {}
+
+    @property
+    def repo_url(self):
+        return f"{self.api_url}/repos/{self.owner}/{self.repo_name}"
+
+    @property
+    def session(self):
+        """Return the pooled session, recreating it after a fork."""
+        with self._lock:
+            if self._session is None or self._pid != os.getpid():
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+                session = requests.Session()
+                session.headers.update({
+                    'Authorization': f'token {self.token}',
+                    'Accept': 'application/vnd.github.v3+json'
+                })
+                retries = Retry(
+                    total=Config.GITHUB_RETRIES,
+                    backoff_factor=0.5,
+                    status_forcelist=(500, 502, 503, 504),
+                    allowed_methods=frozenset(['GET', 'POST', 'PATCH'])
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=Config.GITHUB_POOL_SIZE,
+                    max_retries=retries
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+                self._pid = os.getpid()
+            return self._session
+
+    @property
+    def repo(self):
+        """Return the PyGithub repository object, fetched once per process."""
+        with self._lock:
+            if self._repo is None:
+                from github import Github
+                started = time.perf_counter()
+                client = Github(self.token, base_url=self.api_url)
+                self._repo = client.get_repo(f"{self.owner}/{self.repo_name}")
+                self._record('get_repo', time.perf_counter() - started, 200)
+            return self._repo
+
+    @property
+    def default_branch(self):
+        with self._lock:
+            if self._default_branch is None:
+                self._default_branch = self.repo.default_branch
+            return self._default_branch
+
+    def _record(self, operation, seconds, status=None):
+        self._latencies[operation].append(seconds)
+        GITHUB_REQUEST_DURATION.observe(seconds, operation=operation, status=status or 'error')
+
+    @staticmethod
+    def _retry_after_seconds(value):
+        """Parse a Retry-After header (delay-seconds or HTTP-date); None when absent or invalid."""
+        if not value:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return None
+
+    def _backoff_delay(self, response):
+        """Return seconds to wait before retrying a rate-limited response, or None."""
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = self._retry_after_seconds(response.headers.get('Retry-After'))
+        if retry_after is not None:
+            return min(retry_after, Config.GITHUB_MAX_BACKOFF_SECONDS)
+        if response.headers.get('X-RateLimit-Remaining') == '0':
+            reset = float(response.headers.get('X-RateLimit-Reset', time.time() + 1))
+            return min(max(reset - time.time(), 1), Config.GITHUB_MAX_BACKOFF_SECONDS)
+        return None
+
+    def request(self, operation, method, path, **kwargs):
+        """Call the repository API and return the decoded JSON response."""
+        for attempt in range(Config.GITHUB_RATE_LIMIT_RETRIES + 1):
+            started = time.perf_counter()
+            response = None
+            try:
+                response = self.session.request(method, f"{self.repo_url}{path}", **kwargs)
+            finally:
+                self._record(operation, time.perf_counter() - started,
+                             response.status_code if response is not None else None)
+            if 'X-RateLimit-Remaining' in response.headers:
+                self.rate_limit = {
+                    'remaining': int(response.headers['X-RateLimit-Remaining']),
+                    'reset': int(response.headers.get('X-RateLimit-Reset', 0))
+                }
+            delay = self._backoff_delay(response)
+            if delay is None or attempt == Config.GITHUB_RATE_LIMIT_RETRIES:
+                break
+            logger.warning("GitHub rate limit hit on %s; retrying in %.1fs", operation, delay)
+            time.sleep(delay)
+        response.raise_for_status()
+        return response.json()
+
+    def get_head(self):
+        """Return (commit SHA, tree SHA) of the default branch head."""
+        ref = self.request('get_ref', 'GET', f"/git/ref/heads/{self.default_branch}")
+        commit_sha = ref['object']['sha']
+        tree_sha = self._commit_trees.get(commit_sha)
+        if tree_sha is None:
+            commit = self.request('get_commit', 'GET', f"/git/commits/{commit_sha}")
+            tree_sha = commit['tree']['sha']
+            self._commit_trees[commit_sha] = tree_sha
+        return commit_sha, tree_sha
+
+    def get_tree(self, tree_sha, recursive=False):
+        """Return the raw entries of a tree."""
+        params = {'recursive': '1'} if recursive else None
+        tree_response = self.request('get_tree', 'GET', f"/git/trees/{tree_sha}", params=params)
+        if tree_response.get('truncated'):
+            logger.warning("Tree listing for %s truncated", tree_sha)
+        return tree_response.get('tree', [])
+
+    def get_tree_paths(self, tree_sha):
+        """Return the path -> blob SHA map of a tree, cached for the last tree seen."""
+        with self._lock:
+            if self._tree_paths['sha'] == tree_sha:
+                return self._tree_paths['paths']
+        paths = {
+            item['path']: item['sha']
+            for item in self.get_tree(tree_sha, recursive=True)
+            if item['type'] == 'blob'
+        }
+        self.remember_tree(tree_sha, paths)
+        return paths
+
+    def remember_tree(self, tree_sha, paths):
+        """Cache a tree listing we already know, e.g. one we just created."""
+        with self._lock:
+            self._tree_paths = {'sha': tree_sha, 'paths': paths}
+
+    def create_blob(self, content):
+        """Upload bytes as a blob and return its SHA."""
+        blob_data = {
+            'content': base64.b64encode(content).decode('ascii'),
+            'encoding': 'base64'
+        }
+        return self.request('create_blob', 'POST', '/git/blobs', json=blob_data)['sha']
+
+    def create_blobs(self, loaders):
+        """
+        Upload many blobs concurrently and return their SHAs in input order.
+        Each loader is a callable returning the blob bytes, so at most
+        GITHUB_BLOB_CONCURRENCY files are held in memory at once.
+        """
+        if len(loaders) <= 1 or Config.GITHUB_BLOB_CONCURRENCY <= 1:
+            return [self.create_blob(load()) for load in loaders]
+        workers = min(Config.GITHUB_BLOB_CONCURRENCY, len(loaders))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='github-blob')
+        try:
+            futures = [executor.submit(lambda load=load: self.create_blob(load())) for load in loaders]
+        except RuntimeError:
+            # No new threads once the interpreter is shutting down (e.g. the exit-time flush)
+            executor.shutdown(cancel_futures=True)
+            return [self.create_blob(load()) for load in loaders]
+        with executor:
+            return [future.result() for future in futures]
+
+    def create_tree(self, tree_data, base_tree=None):
+        payload = {'tree': tree_data}
+        if base_tree:
+            payload['base_tree'] = base_tree
+        return self.request('create_tree', 'POST', '/git/trees', json=payload)['sha']
+
+    def create_commit(self, message, tree_sha, parents):
+        commit_data = {
+            'message': message,
+            'tree': tree_sha,
+            'parents': parents
+        }
+        commit_sha = self.request('create_commit', 'POST', '/git/commits', json=commit_data)['sha']
+        self._commit_trees[commit_sha] = tree_sha
+        return commit_sha
+
+    def update_ref(self, commit_sha):
+        """Fast-forward the branch to a commit; raises StaleRefError if the branch has moved."""
+        from requests import HTTPError
+        ref_data = {
+            'sha': commit_sha,
+            'force': False
+        }
+        try:
+            ref = self.request('update_ref', 'PATCH', f"/git/refs/heads/{self.default_branch}", json=ref_data)
+        except HTTPError as e:
+            if e.response is not None and e.response.status_code in (409, 422):
+                raise StaleRefError(f"Branch {self.default_branch} moved: {e.response.text}") from e
+            raise
+        if ref.get('object', {}).get('sha') != commit_sha:
+            raise StaleRefError(f"Branch {self.default_branch} points at {ref.get('object', {}).get('sha')}, not {commit_sha}")
+        return ref
+
+    def stats(self):
+        """Summarize recorded latencies per operation, in milliseconds."""
+        summary = {}
+        for operation, samples in list(self._latencies.items()):
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+            summary[operation] = {
+                'count': len(ordered),
+                'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+                'p50_ms': round(ordered[len(ordered) // 2] * 1000, 2),
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+                'max_ms': round(ordered[-1] * 1000, 2)
+            }
+        return summary
+
+gateway = GitHubGateway(
+    Config.GITHUB_TOKEN,
+    Config.GITHUB_USERNAME,
+    Config.GITHUB_REPO,
+    Config.GITHUB_API_URL
+)
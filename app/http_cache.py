@@ -0,0 +1,153 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import request, session, make_response, current_app
+from flask_login import current_user
+from config.config import Config
+from app.fileio import atomic_write, file_lock
+
+TEMPLATES_PATH = os.path.join(os.path.dirname(__file__), 'templates')
+
+def _templates_stamp():
+    """Fingerprint of the templates, so a deploy never matches an ETag from the last one."""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(TEMPLATES_PATH):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            digest.update(f"{name}:{stat.st_mtime_ns}:{stat.st_size};".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+class Generations:
+    """
+    Generation counters for the content behind cached views ('posts', 'drafts',
+    'images'), one small file each under GENERATIONS_PATH. Every write path
+    bumps the counter of what it changed; the file is replaced atomically, so
+    a single stat tells any worker whether its cached responses are still valid.
+    The stamp also covers the name, mtime and size of every file in the scope's
+    content directory, so changes made outside the CMS (a git pull, a checkout
+    of a modified file, an editor saving in place) are noticed too. That costs
+    one stat per file, the same check the post index makes before a listing.
+    """
+    def __init__(self, path, directories):
+        self.path = path
+        self.directories = directories
+
+    def _file(self, scope):
+        return os.path.join(self.path, scope)
+
+    def bump(self, *scopes):
+        """Record that the content of the scopes changed."""
+        os.makedirs(self.path, exist_ok=True)
+        for scope in scopes:
+            with file_lock(f'generation-{scope}'):
+                try:
+                    with open(self._file(scope), 'r', encoding='utf-8') as f:
+                        generation = int(f.read() or 0)
+                except (FileNotFoundError, ValueError):
+                    generation = 0
+                atomic_write(self._file(scope), str(generation + 1))
+        response_cache.invalidate(scopes)
+
+    def stamp(self, scope):
+        """Return a token that changes whenever the scope is bumped or a file in its directory changes."""
+        try:
+            stat = os.stat(self._file(scope))
+            generation = f"{stat.st_ino:x}.{stat.st_mtime_ns:x}.{stat.st_size:x}"
+        except FileNotFoundError:
+            generation = '0'
+        directory = self.directories.get(scope)
+        return f"{generation}:{_directory_stamp(directory) if directory else '0'}"
+
+def _directory_stamp(path):
+    """Digest of the name, mtime and size of every file directly in a directory."""
+    files = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append(f"{entry.name}:{stat.st_mtime_ns:x}:{stat.st_size:x}")
+    except FileNotFoundError:
+        return '0'
+    return hashlib.sha256(';'.join(sorted(files)).encode('utf-8')).hexdigest()[:16]
+
+class ResponseCache:
+    """
+    Per-process LRU of rendered responses keyed by their ETag. The ETag covers
+    the generations of the view's scopes, so a bump from any worker makes old
+    entries unreachable; bumps in this process also drop them right away.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag):
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+            return entry
+
+    def put(self, etag, scopes, response):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[etag] = (scopes, response.get_data(), response.mimetype)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, scopes):
+        with self._lock:
+            for etag in [etag for etag, entry in self._entries.items() if set(entry[0]) & set(scopes)]:
+                del self._entries[etag]
+
+def _etag(scopes):
+    user_id = current_user.get_id() if current_user.is_authenticated else ''
+    key = '|'.join([TEMPLATES_STAMP, user_id, request.full_path] + [generations.stamp(scope) for scope in scopes])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+def _validated(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def conditional(*scopes):
+    """
+    Give a GET view a strong ETag derived from the generations of its scopes.
+    Matching If-None-Match requests get a 304 without running the view, and
+    other hits are answered from the response cache. Responses that carry
+    flashed messages are never cached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return view(*args, **kwargs)
+            etag = _etag(scopes)
+            if request.if_none_match.contains(etag):
+                return _validated(current_app.response_class(status=304), etag)
+            cached = response_cache.get(etag)
+            if cached is not None:
+                _, body, mimetype = cached
+                return _validated(current_app.response_class(body, mimetype=mimetype), etag)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough or session.get('_flashes'):
+                return response
+            response_cache.put(etag, scopes, response)
+            return _validated(response, etag)
+        return wrapper
+    return decorator
+
+TEMPLATES_STAMP = _templates_stamp()
+response_cache = ResponseCache(Config.RESPONSE_CACHE_ENTRIES)
+generations = Generations(Config.GENERATIONS_PATH, {
+    'posts': Config.POSTS_PATH,
+    'drafts': Config.DRAFTS_PATH,
+    'images': Config.IMAGES_PATH
+})
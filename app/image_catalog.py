@@ -0,0 +1,201 @@
+import os
+import re
+import hashlib
+import threading
+from config.config import Config
+from app.fileio import read_json_if_changed, write_json
+
+MAIN_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+ALTERNATE_EXTENSIONS = ('.webp', '.avif')
+VARIANT_PATTERN = re.compile(r'^(?P<stem>.+)-(?P<width>\d+)w$')
+
+def split_image_name(filename):
+    """Return (stem of the main image, variant width or None) for an image filename."""
+    stem = os.path.splitext(filename)[0]
+    match = VARIANT_PATTERN.match(stem)
+    if match:
+        return match.group('stem'), int(match.group('width'))
+    return stem, None
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ImageCatalog:
+    """
+    Cached catalogue of the images directory.
+    Each main image is described once (content hash, dimensions, size) and
+    grouped with its responsive variants and WebP/AVIF alternates. The directory
+    is only rescanned when its mtime changes, and then only files whose mtime or
+    size changed are re-read. Content hashes (of the stored file and of the
+    uploaded original) map identical uploads to one stored asset.
+    """
+    def __init__(self, images_path, catalog_file):
+        self.images_path = images_path
+        self.catalog_file = catalog_file
+        self._images = {}
+        self._hashes = {}
+        self._ordered = None
+        self._version = 0
+        self._dir_stamp = None
+        self._file_stamp = None
+        self._lock = threading.RLock()
+
+    def _load(self):
+        data, self._file_stamp = read_json_if_changed(self.catalog_file, self._file_stamp)
+        if data is not None:
+            self._set_images(data.get('images', {}))
+            self._version = data.get('version', 0)
+            self._dir_stamp = data.get('dir_stamp')
+
+    def _save(self):
+        self._version += 1
+        self._file_stamp = write_json(self.catalog_file, {
+            'version': self._version,
+            'dir_stamp': self._dir_stamp,
+            'images': self._images
+        })
+
+    def _set_images(self, images):
+        self._images = images
+        self._ordered = None
+        self._hashes = {}
+        for filename, entry in images.items():
+            for key in ('sha256', 'upload_hash'):
+                if entry.get(key):
+                    self._hashes[entry[key]] = filename
+
+    def _describe(self, filename, stat, previous=None):
+        """Read a main image's hash and dimensions (header only)."""
+        from app.uploads import pil_image
+        Image = pil_image()
+        path = os.path.join(self.images_path, filename)
+        try:
+            with Image.open(path) as img:
+                width, height = img.size
+        except (OSError, SyntaxError, Image.DecompressionBombError):
+            width = height = None
+        entry = {
+            'sha256': _file_sha256(path),
+            'width': width,
+            'height': height,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'variants': []
+        }
+        if previous and previous.get('upload_hash'):
+            entry['upload_hash'] = previous['upload_hash']
+        return entry
+
+    def refresh(self):
+        """Rescan the directory if it changed; return the catalogue version."""
+        with self._lock:
+            self._load()
+            try:
+                dir_stamp = os.stat(self.images_path).st_mtime_ns
+            except FileNotFoundError:
+                return self._version
+            if dir_stamp == self._dir_stamp:
+                return self._version
+
+            mains = {}
+            extras = {}
+            with os.scandir(self.images_path) as it:
+                for dir_entry in it:
+                    if not dir_entry.is_file():
+                        continue
+                    ext = os.path.splitext(dir_entry.name)[1].lower()
+                    stem, width = split_image_name(dir_entry.name)
+                    if ext in MAIN_EXTENSIONS and width is None:
+                        mains[dir_entry.name] = dir_entry.stat()
+                    elif ext in MAIN_EXTENSIONS + ALTERNATE_EXTENSIONS:
+                        extras.setdefault(stem, []).append(dir_entry.name)
+
+            images = {}
+            for filename, stat in mains.items():
+                cached = self._images.get(filename)
+                if cached and cached['mtime'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+                    entry = dict(cached)
+                else:
+                    entry = self._describe(filename, stat, cached)
+                entry['variants'] = sorted(extras.get(split_image_name(filename)[0], []))
+                images[filename] = entry
+            self._set_images(images)
+            self._dir_stamp = dir_stamp
+            self._save()
+            return self._version
+
+    def find_by_hash(self, sha256):
+        """Return the filename of a stored image with this content hash, if any."""
+        self.refresh()
+        with self._lock:
+            filename = self._hashes.get(sha256)
+            if filename and os.path.exists(os.path.join(self.images_path, filename)):
+                return filename
+            return None
+
+    def stem_taken(self, filename):
+        """Whether a stored image already uses this name's stem (variants share it)."""
+        self.refresh()
+        stem = split_image_name(filename)[0]
+        with self._lock:
+            return any(split_image_name(name)[0] == stem for name in self._images)
+
+    def add(self, filename, upload_hash):
+        """Record a newly stored image along with the hash of the uploaded bytes."""
+        with self._lock:
+            self._load()
+            stat = os.stat(os.path.join(self.images_path, filename))
+            entry = self._describe(filename, stat)
+            entry['upload_hash'] = upload_hash
+            images = dict(self._images)
+            images[filename] = entry
+            self._set_images(images)
+            self._save()
+
+    def variants_of(self, filename):
+        """Return the variant and alternate filenames stored for a main image."""
+        self.refresh()
+        with self._lock:
+            return list(self._images.get(filename, {}).get('variants', []))
+
+    def _public(self, filename):
+        entry = self._images[filename]
+        return {
+            'url': f'/assets/images/{filename}',
+            'filename': filename,
+            'sha256': entry['sha256'],
+            'width': entry['width'],
+            'height': entry['height'],
+            'size': entry['size'],
+            'variants': [
+                {
+                    'url': f'/assets/images/{variant}',
+                    'filename': variant,
+                    'width': split_image_name(variant)[1] or entry['width']
+                }
+                for variant in entry['variants']
+            ]
+        }
+
+    def page(self, page=1, per_page=50):
+        """Return one page of the catalogue, newest first."""
+        self.refresh()
+        page = max(page, 1)
+        with self._lock:
+            if self._ordered is None:
+                self._ordered = sorted(self._images, key=lambda f: (-self._images[f]['mtime'], f))
+            total = len(self._ordered)
+            start = (page - 1) * per_page
+            return {
+                'images': [self._public(filename) for filename in self._ordered[start:start + per_page]],
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': (total + per_page - 1) // per_page
+            }
+
+image_catalog = ImageCatalog(Config.IMAGES_PATH, Config.IMAGE_CATALOG_FILE)
@@ -0,0 +1,211 @@
+import os
+import io
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageSequence
+from config.config import Config
+from app.fileio import atomic_write
+from app.jobs import create_job, update_job
+from app.commit_queue import commit_queue
+from app.metrics import observe
+from app.http_cache import generations
+
+try:
+    # Registers the AVIF encoder when the optional plugin is installed
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+# Formats that can carry more than one frame
+ANIMATED_FORMATS = ('GIF', 'WEBP', 'PNG')
+FORMAT_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp', 'AVIF': '.avif'}
+
+def variant_filename(filename, width):
+    """Name of the responsive variant of an image at the given width."""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}-{width}w{ext}"
+
+def modern_formats():
+    """Configured modern formats that this Pillow build can actually write."""
+    Image.init()
+    return [image_format for image_format in Config.IMAGE_MODERN_FORMATS if image_format in Image.SAVE]
+
+def _load_frames(img, size=None):
+    """Return the frames of an image (all of them if animated), scaled to fit size."""
+    frames = []
+    for frame in ImageSequence.Iterator(img):
+        frame = frame.copy()
+        if frame.mode == 'P':
+            # Palette images resize badly; work in RGBA and let the encoder re-quantize
+            frame = frame.convert('RGBA')
+        if size:
+            frame.thumbnail(size, Image.Resampling.LANCZOS)
+        frames.append(frame)
+    return frames
+
+def _prepare_frame(frame, image_format):
+    """Convert a frame to a mode the target format supports, keeping alpha where possible."""
+    if image_format == 'JPEG':
+        if frame.mode in ('RGBA', 'LA'):
+            # JPEG has no alpha: flatten onto white rather than black
+            background = Image.new('RGB', frame.size, (255, 255, 255))
+            background.paste(frame.convert('RGB'), mask=frame.getchannel('A'))
+            return background
+        return frame if frame.mode in ('RGB', 'L') else frame.convert('RGB')
+    if frame.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        return frame.convert('RGBA')
+    return frame
+
+def encode_image(frames, image_format, durations=None, loop=0):
+    """Encode frames in a format with its configured encoder settings and return the bytes."""
+    settings = dict(Config.IMAGE_ENCODER_SETTINGS.get(image_format, {}))
+    frames = [_prepare_frame(frame, image_format) for frame in frames]
+    if len(frames) > 1:
+        settings.update(save_all=True, append_images=frames[1:], duration=durations, loop=loop)
+    output = io.BytesIO()
+    frames[0].save(output, image_format, **settings)
+    return output.getvalue()
+
+def encode_outputs(image_path, output_path, size=None):
+    """
+    Encode a copy of image_path, scaled to fit size, to output_path in the source
+    format, plus a sibling file per modern format (WebP, AVIF) that comes out smaller.
+    When the fallback is not resized and re-encoding would not shrink it, the
+    original bytes are kept. Returns the list of paths written.
+    """
+    with open(image_path, 'rb') as f:
+        original = f.read()
+    with Image.open(io.BytesIO(original)) as img:
+        image_format = img.format
+        frames = _load_frames(img, size)
+        durations = [frame.info.get('duration', img.info.get('duration', 100)) for frame in frames]
+        loop = img.info.get('loop', 0)
+        resized = frames[0].size != img.size
+    animated = len(frames) > 1
+
+    fallback = encode_image(frames, image_format, durations, loop)
+    if not resized and len(fallback) >= len(original):
+        fallback = original
+    atomic_write(output_path, fallback)
+    outputs = [output_path]
+
+    stem = os.path.splitext(output_path)[0]
+    for modern_format in modern_formats():
+        if modern_format == image_format or (animated and modern_format not in ANIMATED_FORMATS):
+            continue
+        data = encode_image(frames, modern_format, durations, loop)
+        if len(data) >= len(fallback):
+            continue
+        modern_path = stem + FORMAT_EXTENSIONS[modern_format]
+        atomic_write(modern_path, data)
+        outputs.append(modern_path)
+    return outputs
+
+def optimize_image(image_path, output_path=None):
+    """Optimize the image for web use, in place unless an output path is given."""
+    try:
+        max_size = (Config.IMAGE_MAX_SIZE, Config.IMAGE_MAX_SIZE)
+        return encode_outputs(image_path, output_path or image_path, max_size)
+    except Exception as e:
+        logger.error("Error optimizing image: %s", e)
+        raise
+
+def resize_variant(image_path, output_dir, width):
+    """
+    Write copies of the image scaled down to the given width into output_dir.
+    Returns the paths written; none when the original is not wider than width.
+    """
+    output_path = os.path.join(output_dir, variant_filename(os.path.basename(image_path), width))
+    with Image.open(image_path) as img:
+        if img.width <= width:
+            return []
+        size = (width, img.height)
+    return encode_outputs(image_path, output_path, size)
+
+def _timed_task(task, *args):
+    """Run an image task in a worker process and return (outputs, seconds spent)."""
+    started = time.perf_counter()
+    outputs = task(*args)
+    return outputs, time.perf_counter() - started
+
+class ImagePipeline:
+    """
+    Background image processing on a process pool.
+    The untouched original is kept under IMAGE_ORIGINALS_PATH and every task
+    reads from it: one per responsive size plus the optimized main image, so the
+    CPU-bound resizing uses all cores instead of a web worker. Progress is
+    recorded on a job and the outputs are queued for the next GitHub commit
+    once every task has finished.
+    """
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """Return the process pool, creating it lazily (and again after a fork)."""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, original_path, image_path):
+        """Start processing an uploaded original into image_path and return the job id."""
+        filename = os.path.basename(image_path)
+        output_dir = os.path.dirname(image_path)
+        sizes = sorted(set(Config.IMAGE_SIZES))
+        job_id = create_job('image', status='running', filename=filename,
+                            done=0, total=len(sizes) + 1, variants=[])
+        state = {'done': 0, 'outputs': [], 'errors': [], 'lock': threading.Lock()}
+
+        # The main image and each variant are independent, so they run in parallel
+        futures = [self.executor.submit(_timed_task, resize_variant, original_path, output_dir, width)
+                   for width in sizes]
+        futures.append(self.executor.submit(_timed_task, optimize_image, original_path, image_path))
+        for future in futures:
+            future.add_done_callback(lambda f: self._task_done(job_id, image_path, state, len(futures), f))
+        return job_id
+
+    def _task_done(self, job_id, image_path, state, total, future):
+        with state['lock']:
+            state['done'] += 1
+            try:
+                outputs, seconds = future.result()
+                state['outputs'].extend(outputs)
+                observe('image_task', seconds)
+            except Exception as e:
+                logger.error("Error processing %s: %s", image_path, e)
+                state['errors'].append(str(e))
+            variants = sorted(os.path.basename(path) for path in state['outputs']
+                              if path != image_path)
+            if state['done'] < total:
+                update_job(job_id, done=state['done'], variants=variants)
+                return
+
+        # Every task finished: queue the outputs for the next GitHub commit
+        generations.bump('images')
+        relative_paths = [os.path.relpath(path, Config.BLOG_PATH) for path in state['outputs']]
+        commit_job_id = None
+        if relative_paths:
+            commit_job_id = commit_queue.submit(relative_paths, f"Upload image {os.path.basename(image_path)}")
+        update_job(
+            job_id,
+            done=state['done'],
+            variants=variants,
+            commit_job_id=commit_job_id,
+            status='failed' if state['errors'] else 'succeeded',
+            message='; '.join(state['errors'])
+        )
+
+image_pipeline = ImagePipeline(Config.IMAGE_WORKERS)
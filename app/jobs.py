@@ -0,0 +1,64 @@
+import os
+import json
+import re
+import time
+import uuid
+from config.config import Config
+from app.fileio import write_json
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+def _job_path(job_id):
+    return os.path.join(Config.JOBS_PATH, f"{job_id}.json")
+
+def _write_job(job):
+    """Write a job record atomically so any worker can read its status."""
+    write_json(_job_path(job['id']), job)
+
+def create_job(kind, **fields):
+    """Create a queued job record and return its id."""
+    now = time.time()
+    job = {
+        'id': uuid.uuid4().hex,
+        'kind': kind,
+        'status': 'queued',
+        'message': '',
+        'created_at': now,
+        'updated_at': now
+    }
+    job.update(fields)
+    _write_job(job)
+    return job['id']
+
+def get_job(job_id):
+    """Return a job record, or None if the id is unknown."""
+    if not JOB_ID_PATTERN.match(job_id or ''):
+        return None
+    try:
+        with open(_job_path(job_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def update_job(job_id, **fields):
+    """Merge fields into an existing job record."""
+    job = get_job(job_id)
+    if job is None:
+        return
+    job.update(fields)
+    job['updated_at'] = time.time()
+    _write_job(job)
+
+def prune_jobs(max_age=None):
+    """Remove job records older than max_age seconds."""
+    max_age = Config.JOB_RETENTION_SECONDS if max_age is None else max_age
+    cutoff = time.time() - max_age
+    if not os.path.exists(Config.JOBS_PATH):
+        return
+    with os.scandir(Config.JOBS_PATH) as it:
+        for entry in it:
+            if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
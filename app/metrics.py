@@ -0,0 +1,172 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Upper bounds (seconds) for latency histograms; GitHub calls and image work can take a while
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @property
+    def family(self):
+        """Name the HELP and TYPE lines describe; it must match the samples' name."""
+        return self.name
+
+    def render(self):
+        lines = [f'# HELP {self.family} {self.documentation}', f'# TYPE {self.family} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    @property
+    def family(self):
+        # Counter samples end in _total, so the family is named after them (as prometheus_client does)
+        return f'{self.name}_total'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self, key, value):
+        return [f'{self.family}{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            state['counts'][bisect.bisect_left(self.buckets, value)] += 1
+            state['sum'] += value
+
+    def _samples(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), state['counts']):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(state["sum"])}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+class MetricsRegistry:
+    """
+    In-process metrics in the Prometheus text exposition format.
+    Each worker process keeps its own values, like the GitHub latency stats;
+    scrape every worker (or run one) to see the whole picture.
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self):
+        """Return every metric in the text exposition format."""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+
+REQUEST_DURATION = metrics.histogram(
+    'cms_http_request_duration_seconds', 'Time spent handling HTTP requests.',
+    ('method', 'endpoint', 'status')
+)
+REQUESTS = metrics.counter(
+    'cms_http_requests', 'HTTP requests handled.', ('method', 'endpoint', 'status')
+)
+OPERATION_DURATION = metrics.histogram(
+    'cms_operation_duration_seconds', 'Time spent in instrumented operations.', ('operation',)
+)
+OPERATION_ERRORS = metrics.counter(
+    'cms_operation_errors', 'Instrumented operations that raised an exception.', ('operation',)
+)
+GITHUB_REQUEST_DURATION = metrics.histogram(
+    'cms_github_request_duration_seconds', 'Latency of GitHub API calls.', ('operation', 'status')
+)
+
+def observe(operation, seconds):
+    """Record the duration of an operation timed elsewhere (e.g. in another process)."""
+    OPERATION_DURATION.observe(seconds, operation=operation)
+
+@contextmanager
+def span(operation):
+    """Time the enclosed block as one operation; exceptions are counted and re-raised."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        OPERATION_ERRORS.inc(operation=operation)
+        raise
+    finally:
+        OPERATION_DURATION.observe(time.perf_counter() - started, operation=operation)
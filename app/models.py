@@ -1,32 +1,36 @@
 from flask_login import UserMixin
-from werkzeug.security import check_password_hash
-from flask import current_app
-from config.config import Config
+from app.users import user_store, user_cache
 
 class User(UserMixin):
     """
     User model for authentication.
     Implements Flask-Login's UserMixin for session management.
-    Currently supports a single admin user defined in configuration.
+    Accounts live in the user store; the configured admin is created there on first start.
     """
-    def __init__(self, username):
+    def __init__(self, username, admin=False):
         self.username = username
         self.id = username
+        self.admin = admin
     
     def is_admin(self):
         """Check if the current user is an admin."""
-        return self.username == Config.ADMIN_USERNAME
+        return self.admin
     
     @staticmethod
     def check_credentials(username, password):
         """Check if the provided credentials are valid."""
-        return (username == Config.ADMIN_USERNAME and 
-                password == Config.ADMIN_PASSWORD)
+        return user_store.verify(username, password)
+    
+    @staticmethod
+    def get(username):
+        """Load a user from the store, or None if there is no such account."""
+        account = user_store.get(username)
+        if account is None:
+            return None
+        return User(*account)
 
 def init_login_manager(login_manager):
     @login_manager.user_loader
     def load_user(user_id):
-        """Load user by user_id."""
-        if user_id == Config.ADMIN_USERNAME:
-            return User(user_id)
-        return None 
\ No newline at end of file
+        """Load user by user_id, through the per-process user cache."""
+        return user_cache.get(user_id, User.get)
@@ -0,0 +1,198 @@
+import os
+import threading
+from datetime import date, datetime
+import frontmatter
+from config.config import Config
+from app.metrics import span
+from app.fileio import read_json_if_changed, write_json
+
+INDEX_VERSION = 1
+SORT_ORDERS = ('newest', 'oldest', 'title')
+
+def _as_list(value):
+    """Normalize a frontmatter list field (categories, tags) to a list of strings."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [str(item) for item in value]
+
+def _as_date_string(value):
+    """Store dates as ISO strings so the index stays JSON-serializable and sortable."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value) if value else ''
+
+def read_post_metadata(post_path):
+    """Parse the frontmatter of a post file into an index entry."""
+    with span('frontmatter_parse'), open(post_path, 'r', encoding='utf-8') as f:
+        post = frontmatter.load(f)
+    return {
+        'title': str(post.metadata.get('title', '')),
+        'date': _as_date_string(post.metadata.get('date', '')),
+        'categories': _as_list(post.metadata.get('categories', [])),
+        'tags': _as_list(post.metadata.get('tags', []))
+    }
+
+class PostIndex:
+    """
+    Persistent metadata index for the posts directory.
+    Entries are keyed by filename and validated against the file's mtime and size,
+    so a refresh only re-parses posts that changed since the last listing.
+    The index is stored as a JSON sidecar and shared between workers.
+    Sorted and inverted (category, tag) views are derived from the entries
+    and rebuilt only when the index changes, so paging is a list slice.
+    """
+    def __init__(self, posts_path, index_file):
+        self.posts_path = posts_path
+        self.index_file = index_file
+        self._entries = {}
+        self._index_stamp = None
+        self._views = None
+        self._lock = threading.RLock()
+
+    def _load(self):
+        data, self._index_stamp = read_json_if_changed(self.index_file, self._index_stamp)
+        if data is not None and data.get('version') == INDEX_VERSION:
+            self._entries = data.get('posts', {})
+            self._views = None
+
+    def _save(self):
+        """Write the sidecar atomically so readers never see a partial index."""
+        self._views = None
+        self._index_stamp = write_json(self.index_file, {'version': INDEX_VERSION, 'posts': self._entries})
+
+    def _build_entry(self, filename, stat):
+        entry = read_post_metadata(os.path.join(self.posts_path, filename))
+        entry['mtime'] = stat.st_mtime_ns
+        entry['size'] = stat.st_size
+        return entry
+
+    def refresh(self):
+        """Re-parse changed posts and drop entries for deleted files."""
+        with self._lock:
+            self._load()
+            dirty = False
+            seen = set()
+            if os.path.exists(self.posts_path):
+                with os.scandir(self.posts_path) as it:
+                    for dir_entry in it:
+                        if not dir_entry.name.endswith('.md') or not dir_entry.is_file():
+                            continue
+                        seen.add(dir_entry.name)
+                        stat = dir_entry.stat()
+                        cached = self._entries.get(dir_entry.name)
+                        if (cached and cached['mtime'] == stat.st_mtime_ns
+                                and cached['size'] == stat.st_size):
+                            continue
+                        self._entries[dir_entry.name] = self._build_entry(dir_entry.name, stat)
+                        dirty = True
+            for filename in set(self._entries) - seen:
+                del self._entries[filename]
+                dirty = True
+            if dirty:
+                self._save()
+
+    def update(self, filename):
+        """Re-index a single post after it has been written."""
+        with self._lock:
+            self._load()
+            stat = os.stat(os.path.join(self.posts_path, filename))
+            self._entries[filename] = self._build_entry(filename, stat)
+            self._save()
+
+    def remove(self, filename):
+        """Drop a single post from the index after it has been deleted."""
+        with self._lock:
+            self._load()
+            if self._entries.pop(filename, None) is not None:
+                self._save()
+
+    def _build_views(self):
+        """Build the pre-sorted orderings and the inverted category/tag indexes."""
+        entries = self._entries
+        by_date = sorted(entries, key=lambda f: (entries[f]['date'] or '', f), reverse=True)
+        by_title = sorted(entries, key=lambda f: (entries[f]['title'].lower(), f))
+        views = {
+            'newest': by_date,
+            'title': by_title,
+            'category': {},
+            'tag': {}
+        }
+        # Inverted indexes keep one list per ordering, so filtered pages are slices too
+        for order, filenames in (('newest', by_date), ('title', by_title)):
+            for filename in filenames:
+                entry = entries[filename]
+                for category in entry['categories']:
+                    views['category'].setdefault(category, {}).setdefault(order, []).append(filename)
+                for tag in entry['tags']:
+                    views['tag'].setdefault(tag, {}).setdefault(order, []).append(filename)
+        return views
+
+    def _ordered(self, views, order, category=None, tag=None):
+        """Return the filenames matching the filters in the given base ordering."""
+        if category is None and tag is None:
+            return views[order]
+        if category is not None and tag is not None:
+            by_category = views['category'].get(category, {}).get(order, [])
+            tagged = set(views['tag'].get(tag, {}).get(order, []))
+            return [filename for filename in by_category if filename in tagged]
+        key, value = ('category', category) if category is not None else ('tag', tag)
+        return views[key].get(value, {}).get(order, [])
+
+    def _summary(self, filename):
+        """Return the public fields of an index entry."""
+        entry = self._entries[filename]
+        return {
+            'filename': filename,
+            'title': entry['title'],
+            'date': entry['date'],
+            'categories': entry['categories'],
+            'tags': entry['tags']
+        }
+
+    def query(self, page=1, per_page=20, category=None, tag=None, sort='newest'):
+        """
+        Return one page of posts, optionally filtered by category and/or tag.
+        Sort is one of SORT_ORDERS; 'oldest' walks the date index backwards.
+        """
+        self.refresh()
+        if sort not in SORT_ORDERS:
+            sort = 'newest'
+        page = max(page, 1)
+        with self._lock:
+            if self._views is None:
+                self._views = self._build_views()
+            views = self._views
+            filenames = self._ordered(views, 'title' if sort == 'title' else 'newest', category, tag)
+            total = len(filenames)
+            start = (page - 1) * per_page
+            end = min(start + per_page, total)
+            if start >= total:
+                selected = []
+            elif sort == 'oldest':
+                selected = filenames[total - end:total - start][::-1]
+            else:
+                selected = filenames[start:end]
+            return {
+                'posts': [self._summary(filename) for filename in selected],
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': (total + per_page - 1) // per_page,
+                'sort': sort,
+                'category': category,
+                'tag': tag,
+                'categories': sorted(views['category']),
+                'tags': sorted(views['tag'])
+            }
+
+    def posts(self):
+        """Return all post metadata, newest first."""
+        self.refresh()
+        with self._lock:
+            if self._views is None:
+                self._views = self._build_views()
+            return [self._summary(filename) for filename in self._views['newest']]
+
+post_index = PostIndex(Config.POSTS_PATH, Config.POST_INDEX_FILE)
@@ -0,0 +1,65 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from config.config import Config
+
+class MarkdownRenderer:
+    """
+    Markdown renderer shared by a worker process.
+    One Markdown instance is reset and reused for every render, and results are
+    kept in an LRU cache keyed by the SHA-256 of the source text and bounded
+    both by entry count and by total cached bytes.
+    """
+    def __init__(self, extensions, max_entries, max_bytes):
+        self.extensions = extensions
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._markdown = None
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def render(self, text):
+        """Return the HTML for a Markdown string, from the cache when possible."""
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        with self._lock:
+            html = self._cache.get(key)
+            if html is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+            if self._markdown is None:
+                import markdown
+                self._markdown = markdown.Markdown(extensions=self.extensions)
+            html = self._markdown.reset().convert(text)
+            self._store(key, html)
+            return html
+
+    def _store(self, key, html):
+        size = len(html.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        self._cache[key] = html
+        self._cached_bytes += size
+        while len(self._cache) > self.max_entries or self._cached_bytes > self.max_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_bytes -= len(evicted.encode('utf-8'))
+
+    def stats(self):
+        """Return cache counters for this worker."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._cache),
+                'bytes': self._cached_bytes
+            }
+
+renderer = MarkdownRenderer(
+    Config.MARKDOWN_EXTENSIONS,
+    Config.PREVIEW_CACHE_ENTRIES,
+    Config.PREVIEW_CACHE_BYTES
+)
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required
 from app.models import User
+from app.users import login_limiter, address_limiter
 
 auth = Blueprint('auth', __name__)
 
@@ -10,12 +11,25 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         
+        # Throttle password guessing per client and account, and per client across
+        # accounts, before spending time on the hash
+        address = request.remote_addr or 'unknown'
+        client = f"{address} {username}"
+        retry_after = max(login_limiter.retry_after(client), address_limiter.retry_after(address))
+        if retry_after:
+            flash(f'Too many failed logins; try again in {retry_after} seconds')
+            return render_template('auth/login.html'), 429, {'Retry-After': str(retry_after)}
+        
         if User.check_credentials(username, password):
-            user = User(username)
+            # The per-address count stays: one good login must not reset a spraying client
+            login_limiter.succeeded(client)
+            user = User.get(username)
             login_user(user)
             next_page = request.args.get('next')
             return redirect(next_page or url_for('posts.list_posts'))
         
+        login_limiter.failed(client)
+        address_limiter.failed(address)
         flash('Invalid username or password')
     return render_template('auth/login.html')
 
@@ -23,4 +37,4 @@ def login():
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('auth.login')) 
\ No newline at end of file
+    return redirect(url_for('auth.login')) 
@@ -0,0 +1,206 @@
+import os
+import re
+from datetime import datetime
+from flask import Blueprint, render_template, redirect, url_for, request, flash, abort
+from flask_login import login_required
+import frontmatter
+from config.config import Config
+from app.commit_queue import commit_queue
+from app.fileio import atomic_write, content_version, read_versioned, post_lock
+from app.http_cache import conditional
+from app.scheduler import get_draft_path, publish_draft, publish_schedule, as_site_time
+
+drafts = Blueprint('drafts', __name__)
+
+DRAFT_FILENAME_PATTERN = re.compile(r'^[^/\\]+\.md$')
+
+def check_draft_filename(filename):
+    """Reject names that are not a markdown file directly in _drafts."""
+    if not DRAFT_FILENAME_PATTERN.match(filename) or filename.startswith('.'):
+        abort(404)
+
+def get_relative_path(filename):
+    """Get the path of a draft relative to the blog repository root."""
+    return os.path.relpath(get_draft_path(filename), Config.BLOG_PATH)
+
+def get_publish_at():
+    """Read the optional publish time (a datetime-local value, in SITE_TIMEZONE) from the form."""
+    value = request.form.get('publish_at', '').strip()
+    if not value:
+        return None
+    try:
+        return as_site_time(datetime.fromisoformat(value))
+    except ValueError:
+        return None
+
+def get_all_drafts():
+    """Get all drafts with their metadata and scheduled publish time."""
+    schedule = publish_schedule.entries()
+    all_drafts = []
+    if not os.path.exists(Config.DRAFTS_PATH):
+        return all_drafts
+    for filename in sorted(os.listdir(Config.DRAFTS_PATH)):
+        if not filename.endswith('.md') or filename.startswith('.'):
+            continue
+        try:
+            with open(get_draft_path(filename), 'r', encoding='utf-8') as f:
+                post = frontmatter.load(f)
+        except (OSError, ValueError):
+            continue
+        all_drafts.append({
+            'filename': filename,
+            'title': post.metadata.get('title', filename),
+            'categories': post.metadata.get('categories', []),
+            'publish_at': schedule.get(filename)
+        })
+    return all_drafts
+
+def render_editor(status=200, **fields):
+    return render_template('posts/edit.html', draft=True, cancel_url=url_for('drafts.list_drafts'), **fields), status
+
+@drafts.route('/drafts')
+@login_required
+@conditional('drafts')
+def list_drafts():
+    """List drafts and when they are scheduled to be published."""
+    return render_template('drafts/list.html', drafts=get_all_drafts())
+
+@drafts.route('/drafts/new', methods=['GET', 'POST'])
+@login_required
+def new_draft():
+    """Create a new draft, optionally scheduled for publishing."""
+    if request.method == 'POST':
+        title = request.form['title']
+        content = request.form['content']
+        categories = request.form.get('categories', '').split(',')
+        tags = request.form.get('tags', '').split(',')
+        publish_at = get_publish_at()
+
+        # Drafts are not dated; the date is set when the draft is published
+        filename = f"{title.lower().replace(' ', '-')}.md"
+        check_draft_filename(filename)
+
+        post = frontmatter.Post(
+            content,
+            title=title,
+            categories=[cat.strip() for cat in categories if cat.strip()],
+            tags=[tag.strip() for tag in tags if tag.strip()]
+        )
+
+        os.makedirs(Config.DRAFTS_PATH, exist_ok=True)
+
+        draft_path = get_draft_path(filename)
+        with post_lock(filename):
+            if os.path.exists(draft_path):
+                flash('A draft with this title already exists; choose another title')
+                return render_editor(409,
+                                     post=content,
+                                     title=title,
+                                     categories=request.form.get('categories', ''),
+                                     tags=request.form.get('tags', ''),
+                                     publish_at=publish_at)
+            atomic_write(draft_path, frontmatter.dumps(post))
+        publish_schedule.set(filename, publish_at)
+
+        # Drafts live in the repository too, so they survive a redeploy
+        job_id = commit_queue.submit([get_relative_path(filename)], f"Add draft {filename}")
+        if publish_at:
+            flash(f"Draft saved (job {job_id}); it will be published at {publish_at.strftime('%Y-%m-%d %H:%M')}")
+        else:
+            flash(f'Draft saved; pushing to GitHub in the background (job {job_id})')
+        return redirect(url_for('drafts.list_drafts'))
+
+    return render_editor()
+
+@drafts.route('/drafts/<filename>/edit', methods=['GET', 'POST'])
+@login_required
+@conditional('drafts')
+def edit_draft(filename):
+    """Edit a draft and its publish time."""
+    check_draft_filename(filename)
+    draft_path = get_draft_path(filename)
+
+    if request.method == 'POST':
+        title = request.form['title']
+        content = request.form['content']
+        categories = request.form.get('categories', '').split(',')
+        tags = request.form.get('tags', '').split(',')
+        publish_at = get_publish_at()
+        # Required: a save without the version it was loaded at is a 400, never a blind overwrite
+        loaded_version = request.form['version']
+
+        with post_lock(filename):
+            # Reject the save if the draft changed (or was published) since the editor loaded it
+            current_version = content_version(draft_path)
+            if current_version is None:
+                flash('This draft has been published or deleted')
+                return redirect(url_for('drafts.list_drafts'))
+            if loaded_version != current_version:
+                flash('This draft was changed elsewhere after you opened it. Your changes were not saved; '
+                      'save again to overwrite the newer version.')
+                return render_editor(409,
+                                     post=content,
+                                     title=title,
+                                     categories=request.form.get('categories', ''),
+                                     tags=request.form.get('tags', ''),
+                                     publish_at=publish_at,
+                                     version=current_version)
+
+            post = frontmatter.Post(
+                content,
+                title=title,
+                categories=[cat.strip() for cat in categories if cat.strip()],
+                tags=[tag.strip() for tag in tags if tag.strip()]
+            )
+            atomic_write(draft_path, frontmatter.dumps(post))
+            publish_schedule.set(filename, publish_at)
+
+        job_id = commit_queue.submit([get_relative_path(filename)], f"Update draft {filename}")
+        flash(f'Draft updated; pushing to GitHub in the background (job {job_id})')
+        return redirect(url_for('drafts.list_drafts'))
+
+    if not os.path.isfile(draft_path):
+        abort(404)
+    text, version = read_versioned(draft_path)
+    post = frontmatter.loads(text)
+    return render_editor(post=post.content,
+                         title=post.metadata.get('title', ''),
+                         categories=','.join(post.metadata.get('categories', [])),
+                         tags=','.join(post.metadata.get('tags', [])),
+                         publish_at=publish_schedule.entries().get(filename),
+                         version=version)
+
+@drafts.route('/drafts/<filename>/publish', methods=['POST'])
+@login_required
+def publish_now(filename):
+    """Publish a draft right away instead of waiting for its scheduled time."""
+    check_draft_filename(filename)
+    try:
+        post_filename, changed = publish_draft(filename)
+    except FileNotFoundError:
+        flash('This draft has already been published or deleted')
+        return redirect(url_for('drafts.list_drafts'))
+    except (OSError, ValueError) as e:
+        flash(f'Error publishing draft: {str(e)}')
+        return redirect(url_for('drafts.list_drafts'))
+    publish_schedule.set(filename, None)
+
+    job_id = commit_queue.submit(changed, f"Publish {post_filename}")
+    flash(f'Draft published; pushing to GitHub in the background (job {job_id})')
+    return redirect(url_for('posts.list_posts'))
+
+@drafts.route('/drafts/<filename>/delete', methods=['POST'])
+@login_required
+def delete_draft(filename):
+    """Delete a draft and drop it from the schedule."""
+    check_draft_filename(filename)
+    try:
+        with post_lock(filename):
+            os.remove(get_draft_path(filename))
+        publish_schedule.set(filename, None)
+        # A path that no longer exists is committed as a deletion
+        job_id = commit_queue.submit([get_relative_path(filename)], f"Delete draft {filename}")
+        flash(f'Draft deleted; removing it from GitHub in the background (job {job_id})')
+    except OSError as e:
+        flash(f'Error deleting draft: {str(e)}')
+    return redirect(url_for('drafts.list_drafts'))
@@ -0,0 +1,28 @@
+from flask import Blueprint, jsonify
+from flask_login import login_required
+from app.jobs import get_job
+from app.github_gateway import gateway
+from app.storage import storage
+
+jobs = Blueprint('jobs', __name__)
+
+@jobs.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    """Report the status of a background job."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@jobs.route('/jobs/github-stats', methods=['GET'])
+@login_required
+def github_stats():
+    """Report GitHub API latency per operation for this worker."""
+    return jsonify(gateway.stats())
+
+@jobs.route('/jobs/storage-stats', methods=['GET'])
+@login_required
+def storage_stats():
+    """Report which storage backend is in use and its counters for this worker."""
+    return jsonify(storage.stats())
@@ -1,10 +1,14 @@
 import os
 from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_login import login_required
 from werkzeug.utils import secure_filename
-from PIL import Image
 from config.config import Config
-from app.utils import sync_images
+from app.uploads import inspect_image
+from app.image_catalog import image_catalog, split_image_name
+from app.fileio import atomic_copy, image_lock
+from app.utils import delete_from_github, bulk_filenames, bulk_delete_response
+from app.http_cache import conditional, generations
 
 media = Blueprint('media', __name__)
 
@@ -14,22 +18,10 @@ def allowed_file(filename):
     """Check if the file extension is allowed."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def optimize_image(image_path):
-    """Optimize the image for web use."""
-    try:
-        with Image.open(image_path) as img:
-            # Convert to RGB if necessary
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-            
-            # Calculate new dimensions while maintaining aspect ratio
-            max_size = (800, 800)
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Save with optimized settings
-            img.save(image_path, 'JPEG', quality=85, optimize=True)
-    except Exception as e:
-        print(f"Error optimizing image: {e}")
+@media.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    """Reject oversized uploads with a JSON error."""
+    return jsonify({'error': f'File too large (limit {Config.MAX_UPLOAD_BYTES} bytes)'}), 413
 
 @media.route('/upload', methods=['POST'])
 @login_required
@@ -45,39 +37,101 @@ def upload():
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
         filepath = os.path.join(Config.IMAGES_PATH, filename)
+        original_path = os.path.join(Config.IMAGE_ORIGINALS_PATH, filename)
+        stream = file.stream
+        stream.flush()
         
-        # Ensure the images directory exists
-        os.makedirs(Config.IMAGES_PATH, exist_ok=True)
-        
-        # Save the file
-        file.save(filepath)
+        # The body has already been streamed to a temp file; check the header before accepting it
+        try:
+            inspect_image(stream.path)
+        except ValueError as e:
+            stream.close()
+            return jsonify({'error': str(e)}), 400
         
-        # Optimize the image
-        optimize_image(filepath)
+        # Uploads of the same name take turns from the checks until the image is stored
+        with image_lock(split_image_name(filename)[0]):
+            # Identical bytes map to the asset we already store
+            existing = image_catalog.find_by_hash(stream.sha256)
+            if existing:
+                stream.close()
+                return jsonify({
+                    'location': f'/assets/images/{existing}',
+                    'filename': existing,
+                    'duplicate': True
+                })
+            
+            # Never overwrite a different image stored under the same name
+            if image_catalog.stem_taken(filename) or os.path.exists(original_path):
+                stem, ext = os.path.splitext(filename)
+                filename = f"{stem}-{stream.sha256[:8]}{ext}"
+                filepath = os.path.join(Config.IMAGES_PATH, filename)
+                original_path = os.path.join(Config.IMAGE_ORIGINALS_PATH, filename)
+            
+            # Ensure the images directories exist
+            os.makedirs(Config.IMAGES_PATH, exist_ok=True)
+            os.makedirs(Config.IMAGE_ORIGINALS_PATH, exist_ok=True)
+            
+            # Keep the original, and serve a copy until the optimized version replaces it
+            stream.move_to(original_path)
+            atomic_copy(original_path, filepath)
+            image_catalog.add(filename, stream.sha256)
+        generations.bump('images')
         
-        # Sync images with GitHub
-        success, message = sync_images()
-        if not success:
-            print(f"Warning: Failed to sync images with GitHub: {message}")
+        # Resize and optimize in the background; the job reports progress.
+        # The pipeline (Pillow, the process pool) is loaded on the first upload
+        from app.images import image_pipeline
+        job_id = image_pipeline.submit(original_path, filepath)
         
         # Return the URL for the saved file
         return jsonify({
             'location': f'/assets/images/{filename}',
-            'filename': filename
+            'filename': filename,
+            'job_id': job_id
         })
     
     return jsonify({'error': 'File type not allowed'}), 400
 
 @media.route('/images', methods=['GET'])
 @login_required
+@conditional('images')
 def list_images():
-    """List all uploaded images."""
-    images = []
-    if os.path.exists(Config.IMAGES_PATH):
-        for filename in os.listdir(Config.IMAGES_PATH):
-            if allowed_file(filename):
-                images.append({
-                    'url': f'/assets/images/{filename}',
-                    'filename': filename
-                })
-    return jsonify(images) 
\ No newline at end of file
+    """List uploaded images from the cached catalogue, one page at a time."""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', Config.IMAGES_PER_PAGE, type=int)
+    per_page = min(max(per_page, 1), Config.MAX_IMAGES_PER_PAGE)
+    return jsonify(image_catalog.page(page, per_page))
+
+@media.route('/images/delete', methods=['POST'])
+@login_required
+def delete_images():
+    """Delete several images in a single GitHub commit."""
+    filenames = bulk_filenames()
+    deleted = []
+    errors = []
+    for filename in filenames:
+        if secure_filename(filename) != filename or not allowed_file(filename):
+            errors.append({'filename': filename, 'error': 'Invalid image filename'})
+            continue
+        # Responsive variants and alternates go with their main image
+        variants = image_catalog.variants_of(filename)
+        original_path = os.path.join(Config.IMAGE_ORIGINALS_PATH, filename)
+        if os.path.exists(original_path):
+            os.remove(original_path)
+        for name in [filename] + variants:
+            filepath = os.path.join(Config.IMAGES_PATH, name)
+            try:
+                os.remove(filepath)
+            except FileNotFoundError:
+                # Already gone locally; still remove it from GitHub
+                pass
+            except OSError as e:
+                errors.append({'filename': name, 'error': str(e)})
+                continue
+            deleted.append(os.path.relpath(filepath, Config.BLOG_PATH))
+    
+    success, message = True, 'Nothing to delete'
+    if deleted:
+        generations.bump('images')
+        success, message = delete_from_github(deleted)
+    
+    return bulk_delete_response([os.path.basename(path) for path in deleted], errors, success, message)
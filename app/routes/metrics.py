@@ -0,0 +1,37 @@
+import hmac
+from flask import Blueprint, Response, request
+from flask_login import current_user
+from config.config import Config
+from app.metrics import metrics as registry
+from app.github_gateway import gateway
+from app.rendering import renderer
+
+metrics = Blueprint('metrics', __name__)
+
+GITHUB_RATE_LIMIT = registry.gauge(
+    'cms_github_rate_limit_remaining', 'GitHub API requests left in the current window.'
+)
+PREVIEW_CACHE = registry.gauge(
+    'cms_preview_cache', 'Markdown preview cache counters for this worker.', ('stat',)
+)
+
+def is_authorized():
+    """Allow logged-in users, or scrapers presenting METRICS_TOKEN as a bearer token."""
+    if current_user.is_authenticated:
+        return True
+    if not Config.METRICS_TOKEN:
+        return False
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token, Config.METRICS_TOKEN)
+
+@metrics.route('/metrics', methods=['GET'])
+def export_metrics():
+    """Expose this worker's metrics in the Prometheus text format."""
+    if not is_authorized():
+        return Response('Unauthorized\n', status=401, mimetype='text/plain',
+                        headers={'WWW-Authenticate': 'Bearer'})
+    if 'remaining' in gateway.rate_limit:
+        GITHUB_RATE_LIMIT.set(gateway.rate_limit['remaining'])
+    for stat, value in renderer.stats().items():
+        PREVIEW_CACHE.set(value, stat=stat)
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
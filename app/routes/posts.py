@@ -1,10 +1,16 @@
 import os
 from datetime import datetime
-from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify
+from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, abort
 from flask_login import login_required
 import frontmatter
 from config.config import Config
-from app.utils import commit_and_push_changes, delete_from_github
+from app.utils import delete_from_github, bulk_filenames, bulk_delete_response
+from app.commit_queue import commit_queue
+from app.post_index import post_index
+from app.search import search_index
+from app.rendering import renderer
+from app.fileio import atomic_write, content_version, read_versioned, post_lock
+from app.http_cache import conditional, generations
 
 posts = Blueprint('posts', __name__)
 
@@ -14,28 +20,67 @@ def get_post_path(filename):
 
 def get_all_posts():
     """Get all posts with their metadata."""
-    posts_list = []
-    if os.path.exists(Config.POSTS_PATH):
-        for filename in os.listdir(Config.POSTS_PATH):
-            if filename.endswith('.md'):
-                post_path = get_post_path(filename)
-                with open(post_path, 'r', encoding='utf-8') as f:
-                    post = frontmatter.load(f)
-                    posts_list.append({
-                        'filename': filename,
-                        'title': post.metadata.get('title', ''),
-                        'date': post.metadata.get('date', ''),
-                        'categories': post.metadata.get('categories', []),
-                        'tags': post.metadata.get('tags', [])
-                    })
-    return sorted(posts_list, key=lambda x: x['date'] or '', reverse=True)
+    return post_index.posts()
+
+def get_relative_path(filename):
+    """Get the path of a post relative to the blog repository root."""
+    return os.path.relpath(get_post_path(filename), Config.BLOG_PATH)
+
+def get_listing_args():
+    """Read pagination, filter and sort parameters from the query string."""
+    per_page = request.args.get('per_page', Config.POSTS_PER_PAGE, type=int)
+    return {
+        'page': request.args.get('page', 1, type=int),
+        'per_page': min(max(per_page, 1), Config.MAX_POSTS_PER_PAGE),
+        'category': request.args.get('category') or None,
+        'tag': request.args.get('tag') or None,
+        'sort': request.args.get('sort', 'newest')
+    }
 
 @posts.route('/posts')
 @login_required
+@conditional('posts')
 def list_posts():
-    """List all posts."""
-    posts_list = get_all_posts()
-    return render_template('posts/list.html', posts=posts_list)
+    """List posts, one page at a time."""
+    listing = post_index.query(**get_listing_args())
+    return render_template('posts/list.html', posts=listing['posts'], listing=listing)
+
+@posts.route('/posts.json')
+@login_required
+@conditional('posts')
+def list_posts_json():
+    """List posts as JSON, with the same parameters as the HTML listing."""
+    return jsonify(post_index.query(**get_listing_args()))
+
+def get_search_results():
+    """Run the search in the query string and return it in the shape of a listing."""
+    query = request.args.get('q', '').strip()
+    per_page = request.args.get('per_page', Config.POSTS_PER_PAGE, type=int)
+    per_page = min(max(per_page, 1), Config.MAX_POSTS_PER_PAGE)
+    page = max(request.args.get('page', 1, type=int), 1)
+    results, total = search_index.search(query, limit=per_page, offset=(page - 1) * per_page)
+    return {
+        'q': query,
+        'results': results,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': (total + per_page - 1) // per_page
+    }
+
+@posts.route('/posts/search')
+@login_required
+@conditional('posts')
+def search_posts():
+    """Full-text search over post titles, tags, categories and bodies."""
+    return render_template('posts/search.html', search=get_search_results())
+
+@posts.route('/posts/search.json')
+@login_required
+@conditional('posts')
+def search_posts_json():
+    """Full-text search as JSON, with the same parameters as the HTML page."""
+    return jsonify(get_search_results())
 
 @posts.route('/posts/new', methods=['GET', 'POST'])
 @login_required
@@ -63,17 +108,24 @@ def new_post():
         # Ensure the posts directory exists
         os.makedirs(Config.POSTS_PATH, exist_ok=True)
         
-        # Save the post
+        # Save the post, never overwriting one that already has this name
         post_path = get_post_path(filename)
-        with open(post_path, 'w', encoding='utf-8') as f:
-            f.write(frontmatter.dumps(post))
+        with post_lock(filename):
+            if os.path.exists(post_path):
+                flash('A post with this title already exists today; choose another title')
+                return render_template('posts/edit.html',
+                                       post=content,
+                                       categories=request.form.get('categories', ''),
+                                       tags=request.form.get('tags', ''),
+                                       title=title), 409
+            atomic_write(post_path, frontmatter.dumps(post))
+            post_index.update(filename)
+            search_index.update(filename)
+        generations.bump('posts')
         
-        # Commit and push changes
-        success, message = commit_and_push_changes()
-        if success:
-            flash('Post created and pushed to GitHub successfully')
-        else:
-            flash(f'Post created but not pushed to GitHub: {message}')
+        # Queue the commit; it is pushed in the background
+        job_id = commit_queue.submit([get_relative_path(filename)], f"Add post {filename}")
+        flash(f'Post created; pushing to GitHub in the background (job {job_id})')
         
         return redirect(url_for('posts.list_posts'))
     
@@ -81,6 +133,7 @@ def new_post():
 
 @posts.route('/posts/<filename>/edit', methods=['GET', 'POST'])
 @login_required
+@conditional('posts')
 def edit_post(filename):
     """Edit an existing post."""
     post_path = get_post_path(filename)
@@ -90,58 +143,143 @@ def edit_post(filename):
         content = request.form['content']
         categories = request.form.get('categories', '').split(',')
         tags = request.form.get('tags', '').split(',')
+        # Required: a save without the version it was loaded at is a 400, never a blind overwrite
+        loaded_version = request.form['version']
         
-        # Load existing post to preserve date
-        with open(post_path, 'r', encoding='utf-8') as f:
-            existing_post = frontmatter.load(f)
-        
-        # Update post with new content and metadata
-        post = frontmatter.Post(
-            content,
-            title=title,
-            date=existing_post.metadata.get('date', datetime.now()),
-            categories=[cat.strip() for cat in categories if cat.strip()],
-            tags=[tag.strip() for tag in tags if tag.strip()]
-        )
+        with post_lock(filename):
+            # Reject the save if the post changed since the editor loaded it
+            current_version = content_version(post_path)
+            if current_version is None:
+                flash('This post has been deleted')
+                return redirect(url_for('posts.list_posts'))
+            if loaded_version != current_version:
+                flash('This post was changed elsewhere after you opened it. Your changes were not saved; '
+                      'save again to overwrite the newer version.')
+                return render_template('posts/edit.html',
+                                       post=content,
+                                       title=title,
+                                       categories=request.form.get('categories', ''),
+                                       tags=request.form.get('tags', ''),
+                                       version=current_version), 409
+            
+            # Load existing post to preserve date
+            with open(post_path, 'r', encoding='utf-8') as f:
+                existing_post = frontmatter.load(f)
+            
+            # Update post with new content and metadata
+            post = frontmatter.Post(
+                content,
+                title=title,
+                date=existing_post.metadata.get('date', datetime.now()),
+                categories=[cat.strip() for cat in categories if cat.strip()],
+                tags=[tag.strip() for tag in tags if tag.strip()]
+            )
+            
+            # Save the updated post
+            atomic_write(post_path, frontmatter.dumps(post))
+            post_index.update(filename)
+            search_index.update(filename)
+        generations.bump('posts')
         
-        # Save the updated post
-        with open(post_path, 'w', encoding='utf-8') as f:
-            f.write(frontmatter.dumps(post))
-        
-        # Commit and push changes
-        success, message = commit_and_push_changes()
-        if success:
-            flash('Post updated and pushed to GitHub successfully')
-        else:
-            flash(f'Post updated but not pushed to GitHub: {message}')
+        # Queue the commit; it is pushed in the background
+        job_id = commit_queue.submit([get_relative_path(filename)], f"Update post {filename}")
+        flash(f'Post updated; pushing to GitHub in the background (job {job_id})')
         
         return redirect(url_for('posts.list_posts'))
     
-    # Load existing post for editing
+    # Load existing post for editing, with the version the save will be checked against
+    text, version = read_versioned(post_path)
+    post = frontmatter.loads(text)
+    return render_template('posts/edit.html', 
+                        post=post.content,
+                        title=post.metadata.get('title', ''),
+                        categories=','.join(post.metadata.get('categories', [])),
+                        tags=','.join(post.metadata.get('tags', [])),
+                        version=version)
+
+@posts.route('/posts/<filename>/preview')
+@login_required
+@conditional('posts')
+def preview_post(filename):
+    """Render a saved post to HTML."""
+    post_path = get_post_path(filename)
+    if not os.path.isfile(post_path):
+        abort(404)
     with open(post_path, 'r', encoding='utf-8') as f:
         post = frontmatter.load(f)
-        return render_template('posts/edit.html', 
-                            post=post.content,
-                            title=post.metadata.get('title', ''),
-                            categories=','.join(post.metadata.get('categories', [])),
-                            tags=','.join(post.metadata.get('tags', [])))
+    return render_template('posts/preview.html',
+                           filename=filename,
+                           title=post.metadata.get('title', ''),
+                           html=renderer.render(post.content))
+
+@posts.route('/posts/preview', methods=['POST'])
+@login_required
+def live_preview():
+    """Render unsaved editor content to HTML."""
+    payload = request.get_json(silent=True) or {}
+    content = payload.get('content', request.form.get('content', ''))
+    return jsonify({
+        'html': renderer.render(content),
+        'cache': renderer.stats()
+    })
 
 @posts.route('/posts/<filename>/delete', methods=['POST'])
 @login_required
 def delete_post(filename):
     """Delete a post."""
     post_path = get_post_path(filename)
-    relative_path = os.path.relpath(post_path, Config.BLOG_PATH)
     try:
         # Delete file locally
-        os.remove(post_path)
+        with post_lock(filename):
+            os.remove(post_path)
+            post_index.remove(filename)
+            search_index.remove(filename)
+        generations.bump('posts')
         
-        # Delete from GitHub
-        success, message = delete_from_github(relative_path)
-        if success:
-            flash('Post deleted and removed from GitHub successfully')
-        else:
-            flash(f'Post deleted locally but not from GitHub: {message}')
+        # Queue the deletion; a path that no longer exists is committed as a deletion
+        job_id = commit_queue.submit([get_relative_path(filename)], f"Delete post {filename}")
+        flash(f'Post deleted; removing it from GitHub in the background (job {job_id})')
     except OSError as e:
         flash(f'Error deleting post: {str(e)}')
-    return redirect(url_for('posts.list_posts')) 
\ No newline at end of file
+    return redirect(url_for('posts.list_posts'))
+
+@posts.route('/posts/delete', methods=['POST'])
+@login_required
+def delete_posts():
+    """Delete several posts in a single GitHub commit."""
+    filenames = bulk_filenames()
+    deleted = []
+    errors = []
+    for filename in filenames:
+        if os.path.basename(filename) != filename or not filename.endswith('.md'):
+            errors.append({'filename': filename, 'error': 'Invalid post filename'})
+            continue
+        try:
+            with post_lock(filename):
+                os.remove(get_post_path(filename))
+        except FileNotFoundError:
+            # Already gone locally; still remove it from GitHub
+            pass
+        except OSError as e:
+            errors.append({'filename': filename, 'error': str(e)})
+            continue
+        post_index.remove(filename)
+        search_index.remove(filename)
+        deleted.append(filename)
+    
+    success, message = True, 'Nothing to delete'
+    if deleted:
+        generations.bump('posts')
+        success, message = delete_from_github([get_relative_path(filename) for filename in deleted])
+    
+    if request.is_json:
+        return bulk_delete_response(deleted, errors, success, message)
+    
+    if deleted:
+        if success:
+            flash(f'{len(deleted)} posts deleted and removed from GitHub successfully')
+        else:
+            flash(f'{len(deleted)} posts deleted locally but not from GitHub: {message}')
+    for error in errors:
+        flash(f"Error deleting post {error['filename']}: {error['error']}")
+    return redirect(url_for('posts.list_posts'))
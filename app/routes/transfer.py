@@ -0,0 +1,57 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+from flask_login import login_required
+from config.config import Config
+from app.commit_queue import commit_queue
+from app.transfer import BlogImporter, EXPORT_FORMATS, IMPORT_FORMATS, stream_export
+
+transfer = Blueprint('transfer', __name__)
+
+CONTENT_TYPE_FORMATS = {
+    'application/x-tar': 'tar',
+    'application/gzip': 'tar',
+    'application/x-gzip': 'tar',
+    'application/zip': 'zip',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson'
+}
+
+@transfer.errorhandler(RequestEntityTooLarge)
+def import_too_large(e):
+    """Reject oversized imports with a JSON error."""
+    return jsonify({'error': f'Import too large (limit {Config.MAX_IMPORT_BYTES} bytes)'}), 413
+
+@transfer.route('/import', methods=['POST'])
+@login_required
+def import_content():
+    """
+    Import posts, drafts and images from the request body: a tar (optionally
+    gzipped) or zip archive laid out like the blog, or NDJSON. Everything that
+    was written goes out in one commit.
+    """
+    import_format = request.args.get('format') or CONTENT_TYPE_FORMATS.get(request.mimetype)
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({'error': f"Unknown import format; use one of {', '.join(IMPORT_FORMATS)}"}), 415
+    
+    importer = BlogImporter(overwrite=request.args.get('overwrite') in ('1', 'true', 'yes'))
+    summary = importer.run(request.stream, import_format)
+    
+    if importer.paths:
+        summary['job_id'] = commit_queue.submit(importer.paths, f"Import {len(importer.paths)} files")
+    return jsonify(summary), 200 if not summary['errors'] else 207
+
+@transfer.route('/export.<export_format>', methods=['GET'])
+@login_required
+def export_content(export_format):
+    """Stream a backup of the posts, drafts and images as tar.gz or zip."""
+    export_format = {'tar.gz': 'tar', 'tgz': 'tar'}.get(export_format, export_format)
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Unknown export format; use tar.gz or zip'}), 404
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f"blog-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return Response(
+        stream_with_context(stream_export(export_format)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
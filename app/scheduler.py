@@ -0,0 +1,257 @@
+import os
+import json
+import logging
+import itertools
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import frontmatter
+from config.config import Config
+from app.fileio import atomic_write, file_lock, post_lock
+from app.http_cache import generations
+from app.jobs import create_job, update_job
+from app.post_index import post_index
+from app.search import search_index
+from app.storage import storage
+from app.utils import push_paths
+
+logger = logging.getLogger(__name__)
+
+def get_draft_path(filename):
+    """Get the full path for a draft file."""
+    return os.path.join(Config.DRAFTS_PATH, filename)
+
+def _relative(path):
+    return os.path.relpath(path, Config.BLOG_PATH)
+
+def site_timezone():
+    """Timezone publish times are entered and shown in (SITE_TIMEZONE)."""
+    return ZoneInfo(Config.SITE_TIMEZONE)
+
+def as_site_time(value):
+    """Interpret a naive time as site-local; convert an aware one to site-local."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=site_timezone())
+    return value.astimezone(site_timezone())
+
+def _parse_utc(value):
+    """Read a stored publish time; entries written before times were stored in UTC are site-local."""
+    return as_site_time(datetime.fromisoformat(value)).astimezone(timezone.utc)
+
+def _post_filenames(date, filename):
+    """Candidate post names for a draft: YYYY-MM-DD-<slug>.md, then -2, -3, ... suffixes."""
+    stem, extension = os.path.splitext(filename)
+    yield f"{date}-{filename}"
+    for number in itertools.count(2):
+        yield f"{date}-{stem}-{number}{extension}"
+
+def publish_draft(filename, when=None):
+    """
+    Move a draft into _posts, dated when (default now), and index it.
+    The post is dated in site-local time, like posts written in the editor.
+    An existing post is never replaced: if another post already has the name,
+    the draft is published under the next free -2, -3, ... name. Publishing is
+    idempotent: a post with exactly the content being published is taken as an
+    interrupted earlier publish and reused.
+    Returns (post filename, paths relative to BLOG_PATH that changed).
+    """
+    when = as_site_time(when or datetime.now(timezone.utc)).replace(tzinfo=None)
+    draft_path = get_draft_path(filename)
+    with post_lock(filename):
+        with open(draft_path, 'r', encoding='utf-8') as f:
+            post = frontmatter.load(f)
+        post.metadata['date'] = when
+        text = frontmatter.dumps(post)
+        for post_filename in _post_filenames(when.strftime('%Y-%m-%d'), filename):
+            post_path = os.path.join(Config.POSTS_PATH, post_filename)
+            with post_lock(post_filename):
+                try:
+                    with open(post_path, 'r', encoding='utf-8') as f:
+                        if f.read() != text:
+                            continue
+                except FileNotFoundError:
+                    pass
+                atomic_write(post_path, text)
+            break
+        os.remove(draft_path)
+    post_index.update(post_filename)
+    search_index.update(post_filename)
+    generations.bump('posts', 'drafts')
+    return post_filename, [_relative(post_path), _relative(draft_path)]
+
+class PublishSchedule:
+    """
+    Publish times of scheduled drafts, kept in a JSON file under .cms so the
+    queue survives restarts. Every read-modify-write holds a file lock, so any
+    worker can schedule drafts while another one publishes them. Paths whose
+    push failed are kept as pending and pushed again with exponential backoff
+    (not at all while no storage backend is configured).
+    """
+    def __init__(self, schedule_file):
+        self.schedule_file = schedule_file
+
+    def _read(self):
+        try:
+            with open(self.schedule_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        data.setdefault('drafts', {})
+        data.setdefault('pending_push', [])
+        data.setdefault('retry', None)
+        return data
+
+    def _write(self, data):
+        os.makedirs(os.path.dirname(self.schedule_file), exist_ok=True)
+        atomic_write(self.schedule_file, json.dumps(data, indent=1, sort_keys=True))
+
+    def entries(self):
+        """Return draft filename -> publish time (site-local) for every scheduled draft."""
+        return {
+            filename: _parse_utc(publish_at).astimezone(site_timezone())
+            for filename, publish_at in self._read()['drafts'].items()
+        }
+
+    def set(self, filename, publish_at):
+        """
+        Schedule a draft for publish_at, or unschedule it when publish_at is None.
+        Naive times are taken as site-local; the schedule stores UTC.
+        """
+        with file_lock('schedule'):
+            data = self._read()
+            if publish_at is None:
+                data['drafts'].pop(filename, None)
+            else:
+                publish_at = as_site_time(publish_at).astimezone(timezone.utc)
+                data['drafts'][filename] = publish_at.isoformat(timespec='minutes')
+            self._write(data)
+        generations.bump('drafts')
+
+    def _take_due(self, now):
+        """
+        Return the due drafts (oldest first), the pending paths from failed pushes
+        and the retry state of those paths.
+        """
+        with file_lock('schedule'):
+            data = self._read()
+        due = sorted(
+            (_parse_utc(publish_at), filename)
+            for filename, publish_at in data['drafts'].items()
+            if _parse_utc(publish_at) <= now
+        )
+        return due, data['pending_push'], data['retry']
+
+    def _finish(self, published, pending_push, retry=None):
+        with file_lock('schedule'):
+            data = self._read()
+            for filename in published:
+                data['drafts'].pop(filename, None)
+            data['pending_push'] = sorted(set(pending_push))
+            data['retry'] = retry if pending_push else None
+            self._write(data)
+
+    def _retry_state(self, retry, now):
+        """Retry state after another failed push: the delay doubles each time."""
+        failures = (retry or {}).get('failures', 0) + 1
+        delay = min(Config.SCHEDULER_INTERVAL_SECONDS * 2 ** (failures - 1), Config.SCHEDULER_RETRY_MAX_SECONDS)
+        retry_at = now.astimezone(timezone.utc) + timedelta(seconds=delay)
+        return {'failures': failures, 'next': retry_at.isoformat(timespec='seconds')}
+
+    def _retry_due(self, retry, now):
+        return retry is None or _parse_utc(retry['next']) <= now
+
+    def run_due(self, now=None):
+        """
+        Publish every due draft and push them in one commit.
+        Only one worker on the host runs a batch at a time; the others skip the
+        tick. Returns the job id of the batch, or None if there was nothing to do
+        (including a quiet retry of an earlier failed push, which gets no job).
+        """
+        now = as_site_time(now or datetime.now(timezone.utc))
+        with file_lock('scheduler', blocking=False) as acquired:
+            if not acquired:
+                return None
+            due, pending, retry = self._take_due(now)
+            if not due and not (pending and storage.configured and self._retry_due(retry, now)):
+                return None
+
+            done = []
+            posts = []
+            paths = list(pending)
+            errors = []
+            for publish_at, filename in due:
+                if not os.path.exists(get_draft_path(filename)):
+                    # Deleted since it was scheduled
+                    done.append(filename)
+                    continue
+                try:
+                    post_filename, changed = publish_draft(filename, publish_at)
+                except (OSError, ValueError) as e:
+                    # Left scheduled, so it is tried again on the next tick
+                    logger.error("Error publishing draft %s: %s", filename, e)
+                    errors.append(f"{filename}: {e}")
+                    continue
+                done.append(filename)
+                posts.append(post_filename)
+                paths.extend(changed)
+            # Record the moved files before pushing, so a crash cannot lose them
+            self._finish(done, paths, retry)
+            if not paths:
+                return None
+
+            job_id = None
+            timestamp = now.strftime('%Y-%m-%d %H:%M:%S')
+            if posts:
+                job_id = create_job('publish', status='running', posts=posts, paths=paths)
+                logger.info("Publishing %d scheduled drafts in one commit", len(posts))
+            if len(posts) == 1:
+                message = f"Publish {posts[0]} - {timestamp}"
+            else:
+                message = f"Publish scheduled posts - {timestamp}"
+                if posts:
+                    message += '\n\n' + '\n'.join(f"- {post}" for post in posts)
+            success, result = push_paths(paths, message)
+            if success:
+                self._finish([], [])
+                if not posts:
+                    logger.info("Pushed %d paths left over from an earlier publish", len(paths))
+            else:
+                retry = self._retry_state(retry, now)
+                self._finish([], paths, retry)
+                logger.warning("Pushing published drafts failed (%s); retrying at %s", result, retry['next'])
+                errors.append(result)
+            if job_id:
+                update_job(job_id, status='succeeded' if not errors else 'failed',
+                           message='; '.join(errors) or result)
+            return job_id
+
+class PublishScheduler:
+    """Background thread that runs the publish schedule every interval seconds."""
+    def __init__(self, schedule, interval):
+        self.schedule = schedule
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """Start the ticker thread in this process (again after a fork)."""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='publish-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.schedule.run_due()
+            except Exception as e:
+                logger.error("Scheduled publishing failed: %s", e, exc_info=True)
+
+publish_schedule = PublishSchedule(Config.SCHEDULE_FILE)
+scheduler = PublishScheduler(publish_schedule, Config.SCHEDULER_INTERVAL_SECONDS)
@@ -0,0 +1,156 @@
+import os
+import re
+import threading
+import frontmatter
+from markupsafe import escape, Markup
+from config.config import Config
+from app.db import ThreadConnections
+from app.post_index import _as_list
+from app.metrics import span
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL UNIQUE,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    title,
+    tags,
+    categories,
+    body,
+    tokenize = 'porter unicode61'
+);
+"""
+
+# Column weights for bm25(): title, tags, categories, body
+RANK_WEIGHTS = (10.0, 5.0, 5.0, 1.0)
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+# Snippet markers that cannot occur in post text; swapped for <mark> after escaping
+HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'
+
+def build_match_query(query):
+    """Turn free text into a safe FTS5 query: every term must match, the last as a prefix."""
+    terms = TOKEN_PATTERN.findall(query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def _highlight(snippet):
+    """Escape a snippet and wrap the matched terms in <mark>."""
+    html = str(escape(snippet))
+    return Markup(html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
+class SearchIndex:
+    """
+    Full-text index over post titles, tags, categories and bodies (SQLite FTS5).
+    Each FTS row shares its rowid with the post's row in the documents table.
+    Write paths update single posts; before a query the posts directory mtime
+    is compared with the last sync, and only then are changed files re-indexed.
+    """
+    def __init__(self, db_path, posts_path):
+        self.posts_path = posts_path
+        self._connections = ThreadConnections(db_path, SCHEMA)
+        self._lock = threading.RLock()
+
+    @property
+    def db(self):
+        return self._connections.get()
+
+    def _index_file(self, db, filename, stat):
+        with span('frontmatter_parse'), open(os.path.join(self.posts_path, filename), 'r', encoding='utf-8') as f:
+            post = frontmatter.load(f)
+        self._delete(db, filename)
+        cursor = db.execute(
+            'INSERT INTO documents (filename, mtime, size) VALUES (?, ?, ?)',
+            (filename, stat.st_mtime_ns, stat.st_size)
+        )
+        db.execute(
+            'INSERT INTO posts_fts (rowid, title, tags, categories, body) VALUES (?, ?, ?, ?, ?)',
+            (
+                cursor.lastrowid,
+                str(post.metadata.get('title', '')),
+                ' '.join(_as_list(post.metadata.get('tags', []))),
+                ' '.join(_as_list(post.metadata.get('categories', []))),
+                post.content
+            )
+        )
+
+    def _delete(self, db, filename):
+        row = db.execute('SELECT id FROM documents WHERE filename = ?', (filename,)).fetchone()
+        if row:
+            db.execute('DELETE FROM posts_fts WHERE rowid = ?', row)
+            db.execute('DELETE FROM documents WHERE id = ?', row)
+
+    def update(self, filename):
+        """Re-index a single post after it has been written."""
+        stat = os.stat(os.path.join(self.posts_path, filename))
+        with self._lock, self.db as db:
+            self._index_file(db, filename, stat)
+
+    def remove(self, filename):
+        """Drop a single post from the index after it has been deleted."""
+        with self._lock, self.db as db:
+            self._delete(db, filename)
+
+    def sync(self):
+        """Index posts changed outside the CMS; a no-op unless the directory changed."""
+        try:
+            dir_stamp = str(os.stat(self.posts_path).st_mtime_ns)
+        except FileNotFoundError:
+            return
+        with self._lock, self.db as db:
+            row = db.execute("SELECT value FROM meta WHERE key = 'dir_stamp'").fetchone()
+            if row and row[0] == dir_stamp:
+                return
+            known = {
+                filename: (mtime, size)
+                for filename, mtime, size in db.execute('SELECT filename, mtime, size FROM documents')
+            }
+            seen = set()
+            with os.scandir(self.posts_path) as it:
+                for dir_entry in it:
+                    if not dir_entry.name.endswith('.md') or not dir_entry.is_file():
+                        continue
+                    seen.add(dir_entry.name)
+                    stat = dir_entry.stat()
+                    if known.get(dir_entry.name) != (stat.st_mtime_ns, stat.st_size):
+                        self._index_file(db, dir_entry.name, stat)
+            for filename in set(known) - seen:
+                self._delete(db, filename)
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dir_stamp', ?)", (dir_stamp,))
+
+    def search(self, query, limit=20, offset=0):
+        """Return ranked matches as (filename, title, snippet) dicts, plus the total count."""
+        match = build_match_query(query)
+        if match is None:
+            return [], 0
+        self.sync()
+        weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+        db = self.db
+        total = db.execute('SELECT count(*) FROM posts_fts WHERE posts_fts MATCH ?', (match,)).fetchone()[0]
+        rows = db.execute(
+            f"""
+            SELECT documents.filename, posts_fts.title, snippet(posts_fts, 3, ?, ?, '...', 16)
+            FROM posts_fts
+            JOIN documents ON documents.id = posts_fts.rowid
+            WHERE posts_fts MATCH ?
+            ORDER BY bm25(posts_fts, {weights})
+            LIMIT ? OFFSET ?
+            """,
+            (HIGHLIGHT_START, HIGHLIGHT_END, match, limit, offset)
+        ).fetchall()
+        results = [
+            {'filename': filename, 'title': title, 'snippet': _highlight(snippet)}
+            for filename, title, snippet in rows
+        ]
+        return results, total
+
+search_index = SearchIndex(Config.SEARCH_DB_FILE, Config.POSTS_PATH)
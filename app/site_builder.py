@@ -0,0 +1,303 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import frontmatter
+import markdown
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from config.config import Config
+from app.fileio import atomic_write, file_lock
+from app.post_index import _as_list, _as_date_string
+from app.metrics import observe, span
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+SITE_TEMPLATES_PATH = os.path.join(os.path.dirname(__file__), 'templates', 'site')
+POST_FILENAME_PATTERN = re.compile(r'^(\d{4})-(\d{2})-(\d{2})-(.+)\.md$')
+# Below this many pages a process pool costs more than it saves
+PARALLEL_THRESHOLD = 32
+
+def slugify(value):
+    """Lowercase a tag or category and turn everything but letters and digits into dashes."""
+    return re.sub(r'[^\w]+', '-', str(value).lower(), flags=re.UNICODE).strip('-') or 'untitled'
+
+def archive_slugs(posts):
+    """
+    Map every tag and category label to the slug of its archive page.
+    Labels that differ only in case or in spaces versus dashes share an archive.
+    Other labels whose slugs collide ('C++' and 'C' both give 'c') get a short
+    hash of the label appended, except the one that reads as the slug itself,
+    so that no archive overwrites another.
+    """
+    slugs = {}
+    for kind in ('tags', 'categories'):
+        groups = {}
+        for entry in posts.values():
+            for label in entry[kind]:
+                key = re.sub(r'\s+', '-', label.casefold())
+                groups.setdefault(slugify(label), {}).setdefault(key, []).append(label)
+        slugs[kind] = {}
+        for slug, keys in groups.items():
+            for key, labels in keys.items():
+                unique = slug
+                if len(keys) > 1 and key != slug:
+                    unique = f"{slug}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:6]}"
+                slugs[kind].update(dict.fromkeys(labels, unique))
+    return slugs
+
+def post_target(filename, date_string):
+    """Output path of a post page, Jekyll's /YYYY/MM/DD/title.html without categories."""
+    match = POST_FILENAME_PATTERN.match(filename)
+    if match:
+        year, month, day, title = match.groups()
+    else:
+        title = os.path.splitext(filename)[0]
+        year, month, day = (date_string[:10] or '0000-00-00').split('-')
+    return f"{year}/{month}/{day}/{title}.html"
+
+def atom_date(value):
+    """Format an ISO date string as an RFC 3339 timestamp, treating naive times as UTC."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return '1970-01-01T00:00:00Z'
+    if parsed.tzinfo is None:
+        return parsed.isoformat(timespec='seconds') + 'Z'
+    return parsed.isoformat(timespec='seconds')
+
+_environment = None
+_markdown = None
+
+def template_environment():
+    global _environment
+    if _environment is None:
+        _environment = Environment(
+            loader=FileSystemLoader(SITE_TEMPLATES_PATH),
+            autoescape=select_autoescape(['html', 'xml']),
+            trim_blocks=True,
+            lstrip_blocks=True
+        )
+        _environment.filters['slugify'] = slugify
+    return _environment
+
+def render_markdown(text):
+    """Convert Markdown with one reused converter per process."""
+    global _markdown
+    if _markdown is None:
+        _markdown = markdown.Markdown(extensions=Config.MARKDOWN_EXTENSIONS)
+    return _markdown.reset().convert(text)
+
+def render_post_pages(posts_path, output_path, site, pages):
+    """
+    Render post pages; runs in a worker process.
+    pages is a list of (filename, target, entry) and the time spent is returned.
+    """
+    started = time.perf_counter()
+    template = template_environment().get_template('post.html')
+    for filename, target, entry in pages:
+        with open(os.path.join(posts_path, filename), 'r', encoding='utf-8') as f:
+            post = frontmatter.load(f)
+        html = template.render(site=site, post=dict(entry, html=render_markdown(post.content)))
+        target_path = os.path.join(output_path, target)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        atomic_write(target_path, html)
+    return time.perf_counter() - started
+
+class SiteBuilder:
+    """
+    Static renderer for the blog: a page per post, tag and category archives,
+    a post index and an Atom feed, written under SITE_OUTPUT_PATH.
+    A manifest records each post's content hash and metadata and, for every
+    output file, the posts it was rendered from. A build re-renders only the
+    outputs whose posts changed (or whose set of posts changed) and deletes
+    outputs nothing maps to any more; changing the templates or site settings
+    rebuilds everything. Post pages are rendered on a process pool.
+    """
+    def __init__(self, posts_path, output_path, manifest_file, max_workers=None):
+        self.posts_path = posts_path
+        self.output_path = output_path
+        self.manifest_file = manifest_file
+        self.max_workers = max_workers
+
+    def _settings_stamp(self):
+        """Hash of everything besides the posts that shapes the output."""
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(SITE_TEMPLATES_PATH)):
+            digest.update(name.encode('utf-8'))
+            with open(os.path.join(SITE_TEMPLATES_PATH, name), 'rb') as f:
+                digest.update(f.read())
+        digest.update(json.dumps([
+            Config.SITE_TITLE, Config.SITE_URL, Config.SITE_FEED_ENTRIES, Config.MARKDOWN_EXTENSIONS
+        ]).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+    def _scan(self, previous):
+        """Return (entries for every post, filenames whose content changed)."""
+        posts = {}
+        changed = set()
+        if not os.path.isdir(self.posts_path):
+            return posts, changed
+        for dir_entry in os.scandir(self.posts_path):
+            if not dir_entry.name.endswith('.md') or not dir_entry.is_file():
+                continue
+            filename = dir_entry.name
+            stat = dir_entry.stat()
+            old = previous.get(filename)
+            if old and old['mtime'] == stat.st_mtime_ns and old['size'] == stat.st_size:
+                posts[filename] = old
+                continue
+            with open(dir_entry.path, 'rb') as f:
+                data = f.read()
+            sha = hashlib.sha256(data).hexdigest()
+            if old and old['sha'] == sha:
+                # Touched but not changed
+                posts[filename] = dict(old, mtime=stat.st_mtime_ns, size=stat.st_size)
+                continue
+            with span('frontmatter_parse'):
+                post = frontmatter.loads(data.decode('utf-8'))
+            date_string = _as_date_string(post.metadata.get('date', ''))
+            posts[filename] = {
+                'mtime': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'sha': sha,
+                'title': str(post.metadata.get('title', '')),
+                'date': date_string,
+                'categories': _as_list(post.metadata.get('categories', [])),
+                'tags': _as_list(post.metadata.get('tags', [])),
+                'url': '/' + post_target(filename, date_string)
+            }
+            changed.add(filename)
+        return posts, changed
+
+    def _dependency_graph(self, posts):
+        """Map every output path to the posts it is rendered from, newest first."""
+        newest = sorted(posts, key=lambda filename: (posts[filename]['date'], filename), reverse=True)
+        graph = {'index.html': newest, 'feed.xml': newest[:Config.SITE_FEED_ENTRIES]}
+        for filename in newest:
+            entry = posts[filename]
+            graph[entry['url'].lstrip('/')] = [filename]
+            for kind, values in (('tags', entry['tags']), ('categories', entry['categories'])):
+                for slug in dict.fromkeys(entry['slugs'][kind].values()):
+                    graph.setdefault(f"{kind}/{slug}.html", []).append(filename)
+        return graph
+
+    def _site(self):
+        return {'title': Config.SITE_TITLE, 'url': Config.SITE_URL.rstrip('/')}
+
+    def _render_listing(self, target, posts, deps, site):
+        """Render the index, an archive or the feed."""
+        entries = [dict(posts[filename], filename=filename) for filename in deps]
+        environment = template_environment()
+        if target == 'feed.xml':
+            for entry in entries:
+                with open(os.path.join(self.posts_path, entry['filename']), 'r', encoding='utf-8') as f:
+                    entry['html'] = render_markdown(frontmatter.load(f).content)
+                entry['updated'] = atom_date(entry['date'])
+            updated = entries[0]['updated'] if entries else atom_date('')
+            return environment.get_template('feed.xml').render(site=site, posts=entries, updated=updated)
+        if target == 'index.html':
+            heading = site['title']
+        else:
+            kind, slug = target[:-len('.html')].split('/', 1)
+            links = entries[0]['slugs'][kind]
+            label = next((value for value in entries[0][kind] if links[value] == slug), slug)
+            heading = f"{'Tag' if kind == 'tags' else 'Category'}: {label}"
+        return environment.get_template('archive.html').render(site=site, posts=entries, heading=heading)
+
+    def _render_pages(self, pages, site, workers):
+        """Render post pages, on a process pool when there are enough of them."""
+        if workers == 1 or len(pages) < PARALLEL_THRESHOLD:
+            observe('site_render_pages', render_post_pages(self.posts_path, self.output_path, site, pages))
+            return
+        workers = workers or os.cpu_count() or 1
+        chunk_size = max(1, -(-len(pages) // (workers * 4)))
+        chunks = [pages[i:i + chunk_size] for i in range(0, len(pages), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(render_post_pages, self.posts_path, self.output_path, site, chunk)
+                       for chunk in chunks]
+            for future in futures:
+                observe('site_render_pages', future.result())
+
+    def build(self, full=False, workers=None):
+        """
+        Bring the output up to date with the posts and return build statistics.
+        full=True ignores the manifest and renders everything.
+        """
+        started = time.perf_counter()
+        workers = self.max_workers if workers is None else workers
+        with file_lock('site-build'), span('site_build'):
+            stamp = self._settings_stamp()
+            manifest = self._load_manifest()
+            if full or manifest is None or manifest.get('stamp') != stamp:
+                manifest = {'posts': {}, 'targets': {}}
+            previous_targets = manifest['targets']
+
+            posts, changed = self._scan(manifest['posts'])
+            changed.update(set(manifest['posts']) - set(posts))
+            slugs = archive_slugs(posts)
+            for filename, entry in posts.items():
+                links = {kind: {label: slugs[kind][label] for label in entry[kind]} for kind in slugs}
+                if entry.get('slugs') != links:
+                    # New post, or a slug collision renamed an archive the post links to
+                    posts[filename] = dict(entry, slugs=links)
+                    changed.add(filename)
+            graph = self._dependency_graph(posts)
+            dirty = [
+                target for target, deps in graph.items()
+                if previous_targets.get(target) != deps or not changed.isdisjoint(deps)
+            ]
+            stale = [target for target in previous_targets if target not in graph]
+
+            site = self._site()
+            pages = []
+            listings = []
+            for target in dirty:
+                deps = graph[target]
+                if len(deps) == 1 and posts[deps[0]]['url'] == f'/{target}':
+                    pages.append((deps[0], target, posts[deps[0]]))
+                else:
+                    listings.append(target)
+            self._render_pages(pages, site, workers)
+            for target in listings:
+                target_path = os.path.join(self.output_path, target)
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                atomic_write(target_path, self._render_listing(target, posts, graph[target], site))
+            for target in stale:
+                try:
+                    os.remove(os.path.join(self.output_path, target))
+                except FileNotFoundError:
+                    pass
+
+            os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
+            atomic_write(self.manifest_file, json.dumps({
+                'version': MANIFEST_VERSION,
+                'stamp': stamp,
+                'posts': posts,
+                'targets': graph
+            }))
+        stats = {
+            'posts': len(posts),
+            'changed_posts': len(changed),
+            'pages': len(pages),
+            'listings': len(listings),
+            'removed': len(stale),
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+        logger.info("Site build: %s", stats)
+        return stats
+
+site_builder = SiteBuilder(Config.POSTS_PATH, Config.SITE_OUTPUT_PATH, Config.SITE_MANIFEST_FILE, Config.SITE_WORKERS)
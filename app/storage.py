@@ -0,0 +1,251 @@
+import os
+import time
+import random
+import logging
+import threading
+from config.config import Config
+from app.blob_cache import blob_hashes
+from app.github_gateway import gateway, StaleRefError
+from app.metrics import span
+
+logger = logging.getLogger(__name__)
+
+def _read_file(file_path):
+    """Return a loader that reads a file's bytes when called."""
+    def load():
+        with open(file_path, 'rb') as f:
+            return f.read()
+    return load
+
+def _git_path(relative_path):
+    return relative_path.replace(os.sep, '/')
+
+class GitHubApiBackend:
+    """
+    Storage backend that writes to the blog repository through GitHub's REST API.
+    Changed files are uploaded as blobs, applied as a tree on top of the branch
+    head, committed, and the branch is fast-forwarded; nothing touches the local
+    checkout's git metadata. Blobs are uploaded concurrently by every request;
+    changes that are ready while another commit is being made in the same
+    process go into one commit together, so concurrent requests in a gevent
+    worker neither race each other for the branch nor wait in line.
+    """
+    name = 'github'
+    not_configured_message = "GitHub token not configured"
+
+    def __init__(self):
+        self._commit_lock = threading.Lock()
+        # (commit SHA, tree SHA, path map) of the last commit this process pushed
+        self._last_commit = None
+        # Changes whose blobs are uploaded, waiting for the commit lock
+        self._waiting = []
+
+    @property
+    def configured(self):
+        return bool(Config.GITHUB_TOKEN)
+
+    def _changed_tree_entries(self, relative_paths, remote_paths, uploaded=None):
+        """
+        Build tree entries for the paths whose content differs from the remote tree.
+        Local blob SHAs come from the hash cache, so only modified files are uploaded,
+        concurrently. Paths that no longer exist locally become deletions (a null SHA).
+        Blobs in the uploaded set already exist on GitHub and are not sent again; it
+        is updated with the new uploads. Entries are returned sorted by path,
+        whatever order the uploads finish in.
+        """
+        uploaded = set() if uploaded is None else uploaded
+        entries = {}
+        uploads = []
+        for relative_path in set(relative_paths):
+            git_path = _git_path(relative_path)
+            file_path = os.path.join(Config.BLOG_PATH, relative_path)
+            if os.path.isfile(file_path):
+                sha = blob_hashes.sha_for(relative_path)
+                if remote_paths.get(git_path) == sha:
+                    continue
+                if sha in uploaded:
+                    entries[git_path] = sha
+                else:
+                    uploads.append((git_path, file_path, sha))
+            elif git_path in remote_paths:
+                entries[git_path] = None
+        blob_hashes.save()
+
+        logger.debug("Uploading %d blobs", len(uploads))
+        uploaded_shas = gateway.create_blobs([_read_file(file_path) for _, file_path, _ in uploads])
+        for (git_path, file_path, sha), uploaded_sha in zip(uploads, uploaded_shas):
+            if uploaded_sha != sha:
+                logger.warning("Blob SHA mismatch for %s: %s != %s", git_path, uploaded_sha, sha)
+            entries[git_path] = uploaded_sha
+            uploaded.add(uploaded_sha)
+
+        return [
+            {
+                "path": git_path,
+                "mode": "100644",
+                "type": "blob",
+                "sha": entries[git_path]
+            }
+            for git_path in sorted(entries)
+        ]
+
+    def _commit_tree_entries(self, head_sha, base_tree_sha, remote_paths, tree_data, message):
+        """Create a tree of changes on top of the base tree, commit it and move the branch."""
+        logger.debug("Creating tree with %d changed elements", len(tree_data))
+        tree_sha = gateway.create_tree(tree_data, base_tree=base_tree_sha)
+        commit_sha = gateway.create_commit(message, tree_sha, [head_sha])
+        logger.debug("Created commit with SHA: %s", commit_sha)
+        gateway.update_ref(commit_sha)
+        logger.debug("Updated reference successfully")
+
+        # The new tree is the base tree plus our changes; remember it for the next diff
+        new_paths = dict(remote_paths)
+        for entry in tree_data:
+            if entry['sha'] is None:
+                new_paths.pop(entry['path'], None)
+            else:
+                new_paths[entry['path']] = entry['sha']
+        gateway.remember_tree(tree_sha, new_paths)
+        self._last_commit = (commit_sha, tree_sha, new_paths)
+        return commit_sha
+
+    def _ref_retry_delay(self, attempt):
+        """Full-jitter exponential backoff, so racing workers do not collide again."""
+        ceiling = min(Config.GITHUB_REF_RETRY_BASE_SECONDS * (2 ** attempt), Config.GITHUB_MAX_BACKOFF_SECONDS)
+        return random.uniform(0, ceiling)
+
+    def _commit_on_head(self, build_tree_data, message):
+        """
+        Commit changes on top of the branch head, rebuilding them if the branch moves.
+        build_tree_data(remote_paths) returns the tree entries to apply to the head
+        tree. When another worker updates the branch between reading the head and
+        moving the ref, the head is re-read and the tree rebuilt on it, up to
+        GITHUB_REF_RETRIES times with jittered backoff; no lock is held across workers.
+        Blobs are uploaded before the process's commit lock is taken, and whoever
+        takes it commits every change waiting for it in one commit (a group commit),
+        built on this process's last commit if that landed after the head was read.
+        Returns the number of changed paths; 0 means nothing needed committing.
+        """
+        for attempt in range(Config.GITHUB_REF_RETRIES + 1):
+            # Get the latest commit on the default branch and upload changes against it
+            last_commit = self._last_commit
+            head_sha, base_tree_sha = gateway.get_head()
+            logger.debug("Latest commit SHA: %s", head_sha)
+
+            remote_paths = gateway.get_tree_paths(base_tree_sha)
+            if not build_tree_data(remote_paths):
+                logger.debug("Remote tree already up to date")
+                return 0
+
+            change = {'build_tree_data': build_tree_data, 'message': message, 'changed': None}
+            self._waiting.append(change)
+            try:
+                with self._commit_lock:
+                    if change['changed'] is not None:
+                        # Committed by the push that held the lock before us
+                        return change['changed']
+                    if self._last_commit is not last_commit:
+                        # A push from this process moved the branch since the head was read
+                        head_sha, base_tree_sha, remote_paths = self._last_commit
+                    batch = self._waiting
+                    self._waiting = []
+                    try:
+                        return self._commit_batch(batch, head_sha, base_tree_sha, remote_paths)[id(change)]
+                    except Exception:
+                        # Hand the other changes back; each retries on its own once it gets the lock
+                        self._waiting[:0] = [other for other in batch if other is not change]
+                        raise
+            except StaleRefError:
+                if attempt == Config.GITHUB_REF_RETRIES:
+                    raise
+                delay = self._ref_retry_delay(attempt)
+                logger.info("Branch moved during commit; rebuilding on the new head in %.2fs", delay)
+                time.sleep(delay)
+            finally:
+                if change in self._waiting:
+                    self._waiting.remove(change)
+
+    def _commit_batch(self, batch, head_sha, base_tree_sha, remote_paths):
+        """
+        Commit the changes of a group in one commit, later changes to a path winning.
+        Marks each change with its number of changed paths and returns them by id.
+        """
+        entries = {}
+        messages = []
+        for change in batch:
+            tree_data = change['build_tree_data'](remote_paths)
+            change['paths'] = len(tree_data)
+            if not tree_data:
+                continue
+            for entry in tree_data:
+                entries[entry['path']] = entry
+            message = change['message']
+            messages.append(message([entry['path'] for entry in tree_data]) if callable(message) else message)
+
+        if entries:
+            if len(messages) == 1:
+                commit_message = messages[0]
+            else:
+                commit_message = f"Update blog content ({len(messages)} changes)\n\n"
+                commit_message += '\n'.join(f"- {message.splitlines()[0]}" for message in messages)
+            self._commit_tree_entries(head_sha, base_tree_sha, remote_paths,
+                                      [entries[path] for path in sorted(entries)], commit_message)
+        for change in batch:
+            change['changed'] = change.pop('paths')
+        return {id(change): change['changed'] for change in batch}
+
+    def commit_paths(self, relative_paths, message):
+        """
+        Commit the paths (relative to BLOG_PATH) that differ from the remote branch.
+        Returns the number of changed paths; 0 means the remote was already up to date.
+        """
+        uploaded = set()
+        with span('commit_paths'):
+            # Diff local content hashes against the remote tree (again, if the head moves)
+            return self._commit_on_head(
+                lambda remote_paths: self._changed_tree_entries(relative_paths, remote_paths, uploaded),
+                message
+            )
+
+    def delete_paths(self, relative_paths, message):
+        """
+        Delete paths (relative to BLOG_PATH) from the remote branch in one commit.
+        Only paths present remotely are sent, as null-SHA entries on top of the base
+        tree. The message may be a callable taking the deleted git paths.
+        Returns the number of deleted paths.
+        """
+        requested = sorted({_git_path(path) for path in relative_paths})
+
+        def build_tree_data(remote_paths):
+            return [
+                {
+                    "path": git_path,
+                    "mode": "100644",
+                    "type": "blob",
+                    "sha": None
+                }
+                for git_path in requested
+                if git_path in remote_paths
+            ]
+
+        with span('delete_paths'):
+            return self._commit_on_head(build_tree_data, message)
+
+    def stats(self):
+        return {'backend': self.name, 'github': gateway.stats()}
+
+def create_backend(name):
+    """Return the storage backend called name ('github' or 'git')."""
+    if name == 'github':
+        return GitHubApiBackend()
+    if name == 'git':
+        from app.git_backend import LocalGitBackend
+        return LocalGitBackend(
+            Config.BLOG_PATH,
+            remote=Config.GIT_REMOTE,
+            branch=Config.GIT_BRANCH,
+            push=Config.GIT_PUSH
+        )
+    raise ValueError(f"Unknown storage backend: {name}")
+
+storage = create_backend(Config.STORAGE_BACKEND)
@@ -0,0 +1,290 @@
+import io
+import os
+import re
+import json
+import base64
+import shutil
+import logging
+import tarfile
+import tempfile
+import zipfile
+import frontmatter
+from werkzeug.utils import secure_filename
+from config.config import Config
+from app.fileio import post_lock
+from app.post_index import post_index
+from app.search import search_index
+from app.image_catalog import image_catalog
+from app.http_cache import generations
+from app.utils import IMAGE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+IMPORT_FORMATS = ('tar', 'zip', 'ndjson')
+EXPORT_FORMATS = {'tar': ('application/gzip', 'tar.gz'), 'zip': ('application/zip', 'zip')}
+POST_FILENAME_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}-.+\.md$')
+# Imports also carry the WebP/AVIF alternates the image pipeline writes
+IMAGE_FORMATS = tuple(Config.UPLOAD_IMAGE_FORMATS) + ('WEBP', 'AVIF')
+
+# Directories (relative to BLOG_PATH) that are imported and exported
+CONTENT_DIRS = {
+    '_posts': 'posts',
+    '_drafts': 'drafts',
+    'assets/images': 'images'
+}
+
+def _is_avif(path):
+    """Check for the ISO BMFF 'ftyp' box with an AVIF brand that starts an AVIF file."""
+    with open(path, 'rb') as f:
+        header = f.read(12)
+    return header[4:8] == b'ftyp' and header[8:12] in (b'avif', b'avis')
+
+class BlogImporter:
+    """
+    Writes posts, drafts and images from an archive or NDJSON stream into the blog.
+    Entries are read one at a time and copied through a temp file in their target
+    directory in fixed-size chunks, so memory use does not grow with the archive;
+    each is validated before it replaces anything. Indexes are refreshed once at
+    the end, and the written paths are returned for a single commit.
+    """
+    def __init__(self, overwrite=False):
+        self.overwrite = overwrite
+        self.paths = []
+        self.counts = {'posts': 0, 'drafts': 0, 'images': 0}
+        self.skipped = []
+        self.errors = []
+
+    def _target(self, name):
+        """Map an archive member name to (kind, path), or raise ValueError."""
+        name = name.replace('\\', '/').lstrip('./')
+        directory, _, filename = name.rpartition('/')
+        kind = CONTENT_DIRS.get(directory)
+        if kind is None or not filename or secure_filename(filename) != filename:
+            raise ValueError('not a post, draft or image path')
+        if kind == 'posts' and not POST_FILENAME_PATTERN.match(filename):
+            raise ValueError('post filenames must look like YYYY-MM-DD-title.md')
+        if kind == 'drafts' and not filename.endswith('.md'):
+            raise ValueError('drafts must be .md files')
+        if kind == 'images' and not filename.lower().endswith(IMAGE_EXTENSIONS):
+            raise ValueError('image type not allowed')
+        return kind, os.path.join(Config.BLOG_PATH, directory, filename)
+
+    def _validate(self, kind, tmp_path, path):
+        if kind == 'images':
+            from app.uploads import inspect_image
+            try:
+                inspect_image(tmp_path, IMAGE_FORMATS)
+            except ValueError:
+                # Pillow reads AVIF only with the optional plugin; accept a well-formed header
+                if not (path.lower().endswith('.avif') and _is_avif(tmp_path)):
+                    raise
+            return
+        try:
+            with open(tmp_path, 'r', encoding='utf-8') as f:
+                frontmatter.load(f)
+        except UnicodeDecodeError:
+            raise ValueError('not UTF-8 text')
+        except Exception as e:
+            raise ValueError(f'invalid frontmatter: {e}')
+
+    def add_file(self, name, fileobj):
+        """Validate and store one file read from fileobj; problems are recorded, not raised."""
+        try:
+            kind, path = self._target(name)
+        except ValueError as e:
+            self.skipped.append({'name': name, 'reason': str(e)})
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.import',
+                                        dir=os.path.dirname(path))
+        try:
+            size = 0
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+                    size += len(chunk)
+                    if size > Config.MAX_UPLOAD_BYTES:
+                        raise ValueError(f'larger than {Config.MAX_UPLOAD_BYTES} bytes')
+                    f.write(chunk)
+            self._validate(kind, tmp_path, path)
+            os.chmod(tmp_path, 0o644)
+            with post_lock(os.path.basename(path)):
+                if os.path.exists(path) and not self.overwrite:
+                    self.skipped.append({'name': name, 'reason': 'already exists'})
+                    return
+                os.replace(tmp_path, path)
+        except ValueError as e:
+            self.errors.append({'name': name, 'error': str(e)})
+            return
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.counts[kind] += 1
+        self.paths.append(os.path.relpath(path, Config.BLOG_PATH))
+
+    def import_tar(self, stream):
+        """Import a (possibly compressed) tar read sequentially from stream."""
+        try:
+            with tarfile.open(fileobj=stream, mode='r|*') as archive:
+                for member in archive:
+                    if member.isfile():
+                        self.add_file(member.name, archive.extractfile(member))
+        except tarfile.TarError as e:
+            self.errors.append({'name': None, 'error': f'invalid tar archive: {e}'})
+
+    def import_zip(self, stream):
+        """
+        Import a zip archive. Its directory is at the end of the file, so the
+        stream is first spooled to disk (in chunks) and read from there.
+        """
+        os.makedirs(Config.UPLOAD_TMP_PATH, exist_ok=True)
+        with tempfile.TemporaryFile(dir=Config.UPLOAD_TMP_PATH) as spool:
+            shutil.copyfileobj(stream, spool, CHUNK_SIZE)
+            spool.seek(0)
+            try:
+                with zipfile.ZipFile(spool) as archive:
+                    for info in archive.infolist():
+                        if info.is_dir():
+                            continue
+                        if info.file_size > Config.MAX_UPLOAD_BYTES:
+                            self.errors.append({'name': info.filename,
+                                                'error': f'larger than {Config.MAX_UPLOAD_BYTES} bytes'})
+                            continue
+                        with archive.open(info) as member:
+                            self.add_file(info.filename, member)
+            except zipfile.BadZipFile as e:
+                self.errors.append({'name': None, 'error': f'invalid zip archive: {e}'})
+
+    def _ndjson_lines(self, stream):
+        """Yield (line number, line) without ever holding more than one line in memory."""
+        # base64 grows images by a third; allow for the JSON around them
+        limit = Config.MAX_UPLOAD_BYTES * 4 // 3 + 64 * 1024
+        number = 0
+        while True:
+            line = stream.readline(limit + 1)
+            if not line:
+                return
+            number += 1
+            if len(line) > limit and not line.endswith(b'\n'):
+                # Skip the rest of an oversized line
+                while line and not line.endswith(b'\n'):
+                    line = stream.readline(CHUNK_SIZE)
+                self.errors.append({'name': f'line {number}', 'error': 'line too long'})
+                continue
+            if line.strip():
+                yield number, line
+
+    def import_ndjson(self, stream):
+        """
+        Import newline-delimited JSON, one object per file:
+        {"type": "post" | "draft", "filename": ..., "text": "<markdown with frontmatter>"},
+        or "content" plus "title", "date", "categories", "tags" instead of "text";
+        {"type": "image", "filename": ..., "data": "<base64>"}.
+        """
+        for number, line in self._ndjson_lines(stream):
+            label = f'line {number}'
+            try:
+                entry = json.loads(line)
+                kind = entry.get('type', 'post')
+                filename = entry['filename']
+                if kind == 'image':
+                    data = base64.b64decode(entry['data'], validate=True)
+                    self.add_file(f'assets/images/{filename}', io.BytesIO(data))
+                    continue
+                if kind not in ('post', 'draft'):
+                    raise ValueError(f'unknown type {kind}')
+                text = entry.get('text')
+                if text is None:
+                    metadata = {key: entry[key] for key in ('title', 'date', 'categories', 'tags') if key in entry}
+                    text = frontmatter.dumps(frontmatter.Post(entry.get('content', ''), **metadata))
+                directory = '_posts' if kind == 'post' else '_drafts'
+                self.add_file(f'{directory}/{filename}', io.BytesIO(text.encode('utf-8')))
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                self.errors.append({'name': label, 'error': f'invalid entry: {e}'})
+
+    def run(self, stream, import_format):
+        """Import everything in stream and return a summary."""
+        if import_format not in IMPORT_FORMATS:
+            raise ValueError(f"Unknown import format: {import_format}")
+        getattr(self, f'import_{import_format}')(stream)
+        self.finish()
+        return self.summary()
+
+    def finish(self):
+        """Bring the indexes up to date with everything written, once."""
+        if self.counts['posts']:
+            post_index.refresh()
+            search_index.sync()
+        if self.counts['images']:
+            image_catalog.refresh()
+        scopes = [kind for kind, count in self.counts.items() if count]
+        if scopes:
+            generations.bump(*scopes)
+
+    def summary(self):
+        return dict(self.counts, paths=len(self.paths), skipped=self.skipped, errors=self.errors)
+
+class _ChunkBuffer:
+    """Write-only file object whose contents are handed out (and dropped) as they are produced."""
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def export_paths():
+    """List the content files (relative to BLOG_PATH) that go into an export."""
+    relative_paths = []
+    for directory in CONTENT_DIRS:
+        root = os.path.join(Config.BLOG_PATH, directory)
+        if not os.path.isdir(root):
+            continue
+        for dir_entry in sorted(os.scandir(root), key=lambda entry: entry.name):
+            if dir_entry.is_file() and not dir_entry.name.startswith('.'):
+                relative_paths.append(f"{directory}/{dir_entry.name}")
+    return relative_paths
+
+def stream_export(export_format):
+    """
+    Yield an archive of the blog's posts, drafts and images as it is built.
+    Files are read in chunks and each chunk is yielded as soon as it is compressed,
+    so memory use stays flat however large the blog is.
+    """
+    buffer = _ChunkBuffer()
+    if export_format == 'tar':
+        with tarfile.open(fileobj=buffer, mode='w|gz') as archive:
+            for relative_path in export_paths():
+                path = os.path.join(Config.BLOG_PATH, relative_path)
+                with open(path, 'rb') as f:
+                    info = archive.gettarinfo(arcname=relative_path, fileobj=f)
+                    info.uid = info.gid = 0
+                    info.uname = info.gname = ''
+                    archive.addfile(info, f)
+                yield buffer.drain()
+    elif export_format == 'zip':
+        with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for relative_path in export_paths():
+                path = os.path.join(Config.BLOG_PATH, relative_path)
+                info = zipfile.ZipInfo.from_file(path, arcname=relative_path)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with open(path, 'rb') as src, archive.open(info, 'w') as dest:
+                    for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                        dest.write(chunk)
+                        yield buffer.drain()
+    else:
+        raise ValueError(f"Unknown export format: {export_format}")
+    yield buffer.drain()
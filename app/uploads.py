@@ -0,0 +1,114 @@
+import os
+import uuid
+import hashlib
+import warnings
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+from config.config import Config
+
+def pil_image():
+    """Import Pillow's Image module on first use, with the pixel limit applied."""
+    from PIL import Image
+    # Pillow refuses to open images above twice this many pixels and warns above it
+    Image.MAX_IMAGE_PIXELS = Config.MAX_IMAGE_PIXELS
+    return Image
+
+class UploadTempFile:
+    """
+    Writable temp file that multipart file parts are streamed into chunk by chunk.
+    Writing past MAX_UPLOAD_BYTES aborts the request with 413, and the file is
+    removed on close unless it was persisted with move_to(). The SHA-256 of the
+    content is computed as it streams in, for deduplication.
+    """
+    def __init__(self, directory, limit):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{uuid.uuid4().hex}.upload")
+        self.limit = limit
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = open(self.path, 'w+b')
+        self._persisted = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            self.close()
+            raise RequestEntityTooLarge(f"Uploads are limited to {self.limit} bytes")
+        self._hash.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def readline(self, *args):
+        return self._file.readline(*args)
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def move_to(self, destination):
+        """Atomically move the upload to its final path (same filesystem)."""
+        self._file.close()
+        os.replace(self.path, destination)
+        self._persisted = True
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self._persisted and os.path.exists(self.path):
+            os.remove(self.path)
+
+# Endpoints that read a large body from the stream themselves, with their size limits
+LARGE_BODY_ENDPOINTS = {
+    'transfer.import_content': Config.MAX_IMPORT_BYTES
+}
+
+class UploadRequest(Request):
+    """
+    Request class that streams file uploads to size-limited temp files on disk.
+    Endpoints listed in LARGE_BODY_ENDPOINTS get their own, larger body limit.
+    """
+    @property
+    def max_content_length(self):
+        limit = LARGE_BODY_ENDPOINTS.get(self.endpoint)
+        if limit is not None:
+            return limit
+        return super().max_content_length
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadTempFile(Config.UPLOAD_TMP_PATH, Config.MAX_UPLOAD_BYTES)
+
+def inspect_image(path, formats=None):
+    """
+    Lazily open an uploaded image and check its header before accepting it.
+    Only the header is decoded: returns (format, width, height), or raises
+    ValueError for unreadable images, formats outside formats (by default
+    UPLOAD_IMAGE_FORMATS) and decompression bombs.
+    """
+    Image = pil_image()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(path) as img:
+                image_format, (width, height) = img.format, img.size
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ValueError('Image dimensions are too large')
+    except (OSError, SyntaxError):
+        raise ValueError('File is not a valid image')
+    if image_format not in (formats or Config.UPLOAD_IMAGE_FORMATS):
+        raise ValueError(f'Image format {image_format} not allowed')
+    return image_format, width, height
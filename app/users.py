@@ -0,0 +1,201 @@
+import time
+import logging
+import sqlite3
+import threading
+from werkzeug.security import generate_password_hash, check_password_hash
+from config.config import Config
+from app.db import ThreadConnections
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    is_admin INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS login_failures (
+    client TEXT NOT NULL,
+    failed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS login_failures_client ON login_failures (client, failed_at);
+"""
+
+class UserStore:
+    """
+    CMS accounts in SQLite, with passwords hashed by PASSWORD_HASH_METHOD.
+    The method string carries the cost (e.g. 'pbkdf2:sha256:600000' or
+    'scrypt:32768:8:1'); hashes made with an older setting are upgraded the
+    next time their owner logs in. Failed logins are recorded per client so
+    every worker enforces the same limit.
+    """
+    # Seconds after startup before ADMIN_PASSWORD is compared with the stored hash
+    admin_check_delay = 5.0
+
+    def __init__(self, db_path, hash_method):
+        self.hash_method = hash_method
+        self._connections = ThreadConnections(db_path, SCHEMA)
+        self._dummy_hash = None
+
+    @property
+    def db(self):
+        return self._connections.get()
+
+    def get(self, username):
+        """Return (username, is_admin) for an account, or None."""
+        row = self.db.execute('SELECT username, is_admin FROM users WHERE username = ?', (username,)).fetchone()
+        return (row[0], bool(row[1])) if row else None
+
+    def list_users(self):
+        """Return (username, is_admin) for every account."""
+        rows = self.db.execute('SELECT username, is_admin FROM users ORDER BY username').fetchall()
+        return [(username, bool(is_admin)) for username, is_admin in rows]
+
+    def count(self):
+        return self.db.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def add(self, username, password, is_admin=False):
+        """Create an account; returns False if the username is taken."""
+        password_hash = generate_password_hash(password, method=self.hash_method)
+        try:
+            with self.db:
+                self.db.execute(
+                    'INSERT INTO users (username, password_hash, is_admin, created_at) VALUES (?, ?, ?, ?)',
+                    (username, password_hash, int(is_admin), time.time())
+                )
+        except sqlite3.IntegrityError:
+            return False
+        user_cache.invalidate(username)
+        return True
+
+    def set_password(self, username, password):
+        """Replace an account's password; returns False if there is no such account."""
+        password_hash = generate_password_hash(password, method=self.hash_method)
+        with self.db:
+            cursor = self.db.execute('UPDATE users SET password_hash = ? WHERE username = ?', (password_hash, username))
+        user_cache.invalidate(username)
+        return cursor.rowcount > 0
+
+    def delete(self, username):
+        with self.db:
+            cursor = self.db.execute('DELETE FROM users WHERE username = ?', (username,))
+        user_cache.invalidate(username)
+        return cursor.rowcount > 0
+
+    def verify(self, username, password):
+        """Check a username and password; hashes made with an older method are upgraded."""
+        row = self.db.execute('SELECT password_hash FROM users WHERE username = ?', (username,)).fetchone()
+        if row is None:
+            # Spend the same time as a real check so usernames cannot be probed
+            if self._dummy_hash is None:
+                self._dummy_hash = generate_password_hash('', method=self.hash_method)
+            check_password_hash(self._dummy_hash, password or '')
+            return False
+        if not check_password_hash(row[0], password or ''):
+            return False
+        if not row[0].startswith(f'{self.hash_method}$'):
+            self.set_password(username, password)
+        return True
+
+    def ensure_admin(self, username, password):
+        """
+        Create the configured admin account when the store has no users yet.
+        ADMIN_PASSWORD only seeds that first account: changing it later does not
+        change the stored password (`flask users set-password` does), so a warning
+        is logged at startup while the two differ. The comparison costs a full
+        password hash, so it runs on a background thread once the worker has started.
+        """
+        if not username or not password:
+            return
+        if self.count() == 0:
+            self.add(username, password, is_admin=True)
+            return
+        check = threading.Timer(self.admin_check_delay, self._check_admin_password, args=(username, password))
+        check.name = 'admin-password-check'
+        check.daemon = True
+        check.start()
+
+    def _check_admin_password(self, username, password):
+        row = self.db.execute('SELECT password_hash FROM users WHERE username = ?', (username,)).fetchone()
+        if row is not None and not check_password_hash(row[0], password):
+            logger.warning("ADMIN_PASSWORD does not match the stored password of %s and is not applied; "
+                           "rotate it with `flask users set-password %s`", username, username)
+
+    def recent_failures(self, client, window):
+        """Return (number of failed logins within window seconds, oldest failure time)."""
+        cutoff = time.time() - window
+        with self.db:
+            self.db.execute('DELETE FROM login_failures WHERE failed_at < ?', (cutoff,))
+        return self.db.execute(
+            'SELECT COUNT(*), MIN(failed_at) FROM login_failures WHERE client = ?', (client,)
+        ).fetchone()
+
+    def record_failure(self, client):
+        with self.db:
+            self.db.execute('INSERT INTO login_failures (client, failed_at) VALUES (?, ?)', (client, time.time()))
+
+    def clear_failures(self, client):
+        with self.db:
+            self.db.execute('DELETE FROM login_failures WHERE client = ?', (client,))
+
+class UserCache:
+    """
+    Per-process cache of loaded users, so authenticated requests do not query
+    the store. Entries expire after ttl seconds; changes made in this process
+    invalidate them at once, changes from other workers within the TTL.
+    """
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, load):
+        """Return the cached value for user_id, calling load(user_id) when missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        value = load(user_id)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+class LoginRateLimiter:
+    """
+    Allow at most max_attempts failed logins per client within window seconds.
+    The route uses two limiters: one keyed by address and username, so guessing
+    one account's password does not lock other accounts out, and one keyed by
+    address alone with a higher limit, so one address cannot spray guesses
+    across many usernames.
+    """
+    def __init__(self, store, max_attempts, window):
+        self.store = store
+        self.max_attempts = max_attempts
+        self.window = window
+
+    def retry_after(self, client):
+        """Return the seconds until the client may try again, or 0 if it may try now."""
+        failures, oldest = self.store.recent_failures(client, self.window)
+        if failures < self.max_attempts:
+            return 0
+        return max(1, int(oldest + self.window - time.time()) + 1)
+
+    def failed(self, client):
+        self.store.record_failure(client)
+
+    def succeeded(self, client):
+        self.store.clear_failures(client)
+
+user_store = UserStore(Config.USERS_DB_FILE, Config.PASSWORD_HASH_METHOD)
+user_cache = UserCache(Config.USER_CACHE_TTL_SECONDS)
+login_limiter = LoginRateLimiter(user_store, Config.LOGIN_MAX_ATTEMPTS, Config.LOGIN_WINDOW_SECONDS)
+address_limiter = LoginRateLimiter(user_store, Config.LOGIN_MAX_ATTEMPTS_PER_ADDRESS, Config.LOGIN_WINDOW_SECONDS)
@@ -0,0 +1 @@
+"""Benchmarks and the fake GitHub API they run against."""
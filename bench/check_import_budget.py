@@ -0,0 +1,112 @@
+"""
+Startup budget check: time-to-first-request of a fresh worker.
+
+Boots the app in new interpreters the way a gunicorn worker does (importing
+wsgi, which creates the app) and serves one request, timing each step. Fails
+with exit status 1 when the median time-to-first-request exceeds the budget,
+or when a dependency that should load on first use (PyGithub, requests,
+Pillow, Markdown) was imported during startup. Run it in CI or before a
+deploy to catch startup regressions.
+
+Usage: python -m bench.check_import_budget --budget-ms 400 --runs 5 --output startup.json
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from bench.run import _percentile, _git_revision
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED_MODULES = ('github', 'requests', 'urllib3', 'PIL', 'markdown')
+
+# Runs in the fresh interpreter; prints its measurements as JSON
+BOOT_SCRIPT = """
+import sys, json, time
+started = time.perf_counter()
+import wsgi
+imported = time.perf_counter()
+response = wsgi.app.test_client().get('/login')
+served = time.perf_counter()
+print(json.dumps({
+    'status': response.status_code,
+    'import_seconds': imported - started,
+    'first_request_seconds': served - started,
+    'modules': sorted(sys.modules)
+}))
+"""
+
+def boot(env):
+    """Start one interpreter, serve a request and return its measurements."""
+    result = subprocess.run([sys.executable, '-c', BOOT_SCRIPT], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run(args):
+    root = tempfile.mkdtemp(prefix='cms-startup-')
+    env = dict(
+        os.environ,
+        BLOG_PATH=os.path.join(root, 'blog'),
+        ADMIN_USERNAME='bench',
+        ADMIN_PASSWORD='bench',
+        SCHEDULER_ENABLED='false',
+        LOG_LEVEL='WARNING'
+    )
+    try:
+        # The first boot creates the admin account and state files; later boots are typical restarts
+        boot(env)
+        runs = [boot(env) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    first_request = [entry['first_request_seconds'] for entry in runs]
+    imports = [entry['import_seconds'] for entry in runs]
+    loaded = sorted({
+        module.split('.')[0] for entry in runs for module in entry['modules']
+        if module.split('.')[0] in args.deferred
+    })
+    median_ms = _percentile(first_request, 0.50) * 1000
+    return {
+        'created': datetime.now().isoformat(),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {'runs': args.runs, 'budget_ms': args.budget_ms, 'deferred': list(args.deferred)},
+        'import_ms': {'p50': _percentile(imports, 0.50) * 1000, 'max': max(imports) * 1000},
+        'first_request_ms': {'p50': median_ms, 'max': max(first_request) * 1000},
+        'statuses': sorted({entry['status'] for entry in runs}),
+        'deferred_modules_loaded': loaded,
+        'within_budget': median_ms <= args.budget_ms and not loaded
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=400.0,
+                        help='Largest acceptable median time-to-first-request')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to boot')
+    parser.add_argument('--deferred', default=','.join(DEFERRED_MODULES),
+                        help='Comma-separated top-level modules that must not load at startup')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args()
+    args.deferred = [module for module in args.deferred.split(',') if module]
+
+    report = run(args)
+    data = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(data + '\n')
+    else:
+        print(data)
+
+    if report['deferred_modules_loaded']:
+        print(f"Loaded at startup: {', '.join(report['deferred_modules_loaded'])}", file=sys.stderr)
+    print(f"Time to first request: p50 {report['first_request_ms']['p50']:.0f} ms "
+          f"(budget {args.budget_ms:.0f} ms)", file=sys.stderr)
+    sys.exit(0 if report['within_budget'] else 1)
+
+if __name__ == '__main__':
+    main()
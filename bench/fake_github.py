@@ -0,0 +1,241 @@
+"""
+In-memory fake of the GitHub REST endpoints used by the CMS.
+
+Implements just enough of the repos, git/blobs, git/trees, git/commits and
+git/refs APIs for app.utils to push against it, with optional per-request
+latency to mimic a remote round-trip. Every request is counted per route.
+
+Usage: python -m bench.fake_github --port 8765 --latency 0.05
+"""
+import re
+import json
+import time
+import base64
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def _sha(kind, data):
+    digest = hashlib.sha1()
+    digest.update(f"{kind} {len(data)}\0".encode('ascii'))
+    digest.update(data)
+    return digest.hexdigest()
+
+class FakeRepo:
+    """Objects and refs of one repository; trees are stored as flat path maps."""
+    def __init__(self, owner, name, branch='main'):
+        self.owner = owner
+        self.name = name
+        self.branch = branch
+        self.blobs = {}
+        self.trees = {}
+        self.commits = {}
+        self.refs = {}
+        self.lock = threading.Lock()
+        root = self._store_tree({})
+        self.refs[branch] = self._store_commit('Initial commit', root, [])
+
+    def _store_tree(self, paths):
+        sha = _sha('tree', json.dumps(sorted(paths.items())).encode('utf-8'))
+        self.trees[sha] = dict(paths)
+        return sha
+
+    def _store_commit(self, message, tree, parents):
+        payload = json.dumps([message, tree, parents, time.time()]).encode('utf-8')
+        sha = _sha('commit', payload)
+        self.commits[sha] = {'message': message, 'tree': tree, 'parents': parents}
+        return sha
+
+    def create_blob(self, content, encoding):
+        data = base64.b64decode(content) if encoding == 'base64' else content.encode('utf-8')
+        sha = _sha('blob', data)
+        with self.lock:
+            self.blobs[sha] = data
+        return sha
+
+    def create_tree(self, base_tree, entries):
+        with self.lock:
+            paths = dict(self.trees.get(base_tree, {})) if base_tree else {}
+            for entry in entries:
+                if entry.get('sha') is None:
+                    paths.pop(entry['path'], None)
+                else:
+                    paths[entry['path']] = entry['sha']
+            return self._store_tree(paths)
+
+    def create_commit(self, message, tree, parents):
+        with self.lock:
+            return self._store_commit(message, tree, parents)
+
+    def update_ref(self, branch, sha, force):
+        """Move a branch; non-forced updates must be fast-forwards."""
+        with self.lock:
+            current = self.refs.get(branch)
+            if not force and current is not None and current not in self.commits[sha]['parents']:
+                return False
+            self.refs[branch] = sha
+            return True
+
+    def files(self):
+        """Return path -> bytes of the branch head, for assertions."""
+        with self.lock:
+            tree = self.trees[self.commits[self.refs[self.branch]]['tree']]
+            return {path: self.blobs[sha] for path, sha in tree.items()}
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    routes = [
+        ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)', 'get_repo'),
+        ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/(?:ref|refs)/heads/(?P<branch>.+)', 'get_ref'),
+        ('PATCH', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/refs/heads/(?P<branch>.+)', 'patch_ref'),
+        ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/commits/(?P<sha>\w+)', 'get_commit'),
+        ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/commits/(?P<sha>\w+)', 'get_commit'),
+        ('POST', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/blobs', 'post_blob'),
+        ('POST', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/trees', 'post_tree'),
+        ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/trees/(?P<sha>\w+)', 'get_tree'),
+        ('POST', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/commits', 'post_commit'),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def base_url(self):
+        return f"http://{self.headers.get('Host')}"
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('X-RateLimit-Limit', '5000')
+        self.send_header('X-RateLimit-Remaining', '4999')
+        self.send_header('X-RateLimit-Reset', str(int(time.time()) + 3600))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method):
+        path, _, query = self.path.partition('?')
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                self.server.calls[handler] += 1
+                repo = self.server.repo
+                params = match.groupdict()
+                if params.get('repo') != repo.name:
+                    return self._send(404, {'message': 'Not Found'})
+                return getattr(self, handler)(repo, params, body, query)
+        self._send(404, {'message': 'Not Found'})
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def get_repo(self, repo, params, body, query):
+        self._send(200, {
+            'name': repo.name,
+            'full_name': f"{repo.owner}/{repo.name}",
+            'default_branch': repo.branch,
+            'url': f"{self.base_url}/repos/{repo.owner}/{repo.name}"
+        })
+
+    def get_ref(self, repo, params, body, query):
+        sha = repo.refs.get(params['branch'])
+        if sha is None:
+            return self._send(404, {'message': 'Not Found'})
+        self._send(200, {
+            'ref': f"refs/heads/{params['branch']}",
+            'url': f"{self.base_url}/repos/{repo.owner}/{repo.name}/git/refs/heads/{params['branch']}",
+            'object': {'sha': sha, 'type': 'commit'}
+        })
+
+    def patch_ref(self, repo, params, body, query):
+        if not repo.update_ref(params['branch'], body['sha'], body.get('force', False)):
+            return self._send(422, {'message': 'Update is not a fast forward'})
+        self._send(200, {'ref': f"refs/heads/{params['branch']}", 'object': {'sha': body['sha']}})
+
+    def get_commit(self, repo, params, body, query):
+        commit = repo.commits.get(params['sha'])
+        if commit is None:
+            return self._send(404, {'message': 'Not Found'})
+        self._send(200, {
+            'sha': params['sha'],
+            'url': f"{self.base_url}/repos/{repo.owner}/{repo.name}/commits/{params['sha']}",
+            'tree': {'sha': commit['tree']},
+            'commit': {
+                'message': commit['message'],
+                'tree': {'sha': commit['tree']}
+            },
+            'parents': [{'sha': parent} for parent in commit['parents']]
+        })
+
+    def post_blob(self, repo, params, body, query):
+        self._send(201, {'sha': repo.create_blob(body['content'], body.get('encoding', 'utf-8'))})
+
+    def post_tree(self, repo, params, body, query):
+        base_tree = body.get('base_tree')
+        if base_tree and base_tree not in repo.trees:
+            return self._send(422, {'message': 'Invalid base_tree'})
+        self._send(201, {'sha': repo.create_tree(base_tree, body.get('tree', []))})
+
+    def get_tree(self, repo, params, body, query):
+        paths = repo.trees.get(params['sha'])
+        if paths is None:
+            return self._send(404, {'message': 'Not Found'})
+        self._send(200, {
+            'sha': params['sha'],
+            'truncated': False,
+            'tree': [
+                {'path': path, 'mode': '100644', 'type': 'blob', 'sha': sha}
+                for path, sha in sorted(paths.items())
+            ]
+        })
+
+    def post_commit(self, repo, params, body, query):
+        sha = repo.create_commit(body['message'], body['tree'], body.get('parents', []))
+        self._send(201, {'sha': sha})
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, owner='blogger', name='89hardy.github.io', latency=0.0):
+        super().__init__(address, FakeGitHubHandler)
+        self.repo = FakeRepo(owner, name)
+        self.latency = latency
+        self.calls = Counter()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def start_fake_github(port=0, latency=0.0, owner='blogger'):
+    """Start a fake GitHub server on a background thread and return it."""
+    server = FakeGitHubServer(('127.0.0.1', port), owner=owner, latency=latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    parser.add_argument('--owner', default='blogger')
+    args = parser.parse_args()
+    server = FakeGitHubServer(('127.0.0.1', args.port), owner=args.owner, latency=args.latency)
+    print(f"Fake GitHub API listening on {server.url}")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Concurrent load test of the CMS under gunicorn, comparing worker classes.
+
+For each worker class, generates a synthetic blog, starts the fake GitHub API
+with per-request latency and serves the app with `gunicorn -c gunicorn.conf.py`
+(one worker). Concurrent clients then save posts, each pushed to the fake
+GitHub inline (COMMIT_QUEUE_ENABLED=false), while others list posts. A sync
+worker handles one request at a time, so reads wait behind pushes; a gevent
+worker overlaps them while the GitHub calls wait on the network, and saves
+whose pushes overlap go into one commit. Throughput and latency percentiles
+per request kind, and the commits that landed, are reported as JSON.
+
+Usage: python -m bench.load_test --clients 16 --duration 10 --latency 0.05 --output load.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+import requests
+from bench.fake_github import start_fake_github
+from bench.run import generate_blog, _paragraphs, _percentile, _git_revision
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _wait_ready(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            requests.get(f"{url}/login", timeout=5)
+            return
+        except (requests.ConnectionError, requests.Timeout):
+            time.sleep(0.1)
+    raise RuntimeError('gunicorn did not start in time')
+
+def _branch_commits(repo):
+    """Count the commits reachable from the branch head, i.e. pushes that landed."""
+    count = 0
+    sha = repo.refs[repo.branch]
+    while sha:
+        count += 1
+        parents = repo.commits[sha]['parents']
+        sha = parents[0] if parents else None
+    return count
+
+def _summary(samples, errors, duration):
+    if not samples:
+        return {'requests': 0, 'errors': errors}
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_per_second': len(samples) / duration,
+        'latency_ms': {
+            'p50': _percentile(samples, 0.50) * 1000,
+            'p95': _percentile(samples, 0.95) * 1000,
+            'p99': _percentile(samples, 0.99) * 1000,
+            'max': max(samples) * 1000
+        }
+    }
+
+class Client(threading.Thread):
+    """One logged-in editor issuing requests of one kind until the deadline."""
+    def __init__(self, url, kind, number, deadline, think=0.0):
+        super().__init__(daemon=True)
+        self.url = url
+        self.kind = kind
+        self.number = number
+        self.deadline = deadline
+        self.think = think
+        self.rng = random.Random(number)
+        self.samples = []
+        self.errors = 0
+
+    def login(self):
+        session = requests.Session()
+        session.post(f"{self.url}/login", data={'username': 'bench', 'password': 'bench'})
+        return session
+
+    def _request(self, session, count):
+        if self.kind == 'save':
+            return session.post(f"{self.url}/posts/new", allow_redirects=False, data={
+                'title': f'Load {self.number} {count}',
+                'content': _paragraphs(self.rng, 4),
+                'categories': 'code',
+                'tags': 'python'
+            }), 302
+        return session.get(f"{self.url}/posts.json"), 200
+
+    def run(self):
+        session = self.login()
+        count = 0
+        while time.monotonic() < self.deadline:
+            started = time.perf_counter()
+            try:
+                response, expected = self._request(session, count)
+                ok = response.status_code == expected
+            except requests.RequestException:
+                ok = False
+            if ok:
+                self.samples.append(time.perf_counter() - started)
+            else:
+                self.errors += 1
+            count += 1
+            time.sleep(self.think)
+
+def run_worker_class(args, worker_class):
+    root = tempfile.mkdtemp(prefix='cms-load-')
+    blog_path = os.path.join(root, 'blog')
+    os.makedirs(blog_path)
+    generate_blog(blog_path, args.posts, 0, seed=args.seed)
+    server = start_fake_github(latency=args.latency)
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        BLOG_PATH=blog_path,
+        GITHUB_TOKEN='bench',
+        GITHUB_USERNAME=server.repo.owner,
+        GITHUB_REPO=server.repo.name,
+        GITHUB_API_URL=server.url,
+        ADMIN_USERNAME='bench',
+        ADMIN_PASSWORD='bench',
+        SECRET_KEY='bench',
+        COMMIT_QUEUE_ENABLED='false',
+        SCHEDULER_ENABLED='false',
+        GUNICORN_WORKER_CLASS=worker_class,
+        WEB_CONCURRENCY='1',
+        LOG_LEVEL='warning'
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'wsgi:app'],
+        cwd=ROOT, env=env
+    )
+    try:
+        _wait_ready(url, process)
+        # Warm up: builds the post index and the first push fetches the remote tree
+        warmup = Client(url, 'save', 'warmup', 0)
+        session = warmup.login()
+        warmup._request(session, 0)
+        session.get(f"{url}/posts.json")
+
+        commits_before = _branch_commits(server.repo)
+        calls_before = sum(server.calls.values())
+        deadline = time.monotonic() + args.duration
+        writers = max(1, round(args.clients * args.save_fraction))
+        clients = [Client(url, 'save' if i < writers else 'list', i, deadline, args.think) for i in range(args.clients)]
+        started = time.perf_counter()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        duration = time.perf_counter() - started
+
+        results = {}
+        for kind in ('save', 'list'):
+            group = [client for client in clients if client.kind == kind]
+            results[kind] = _summary([sample for client in group for sample in client.samples],
+                                     sum(client.errors for client in group), duration)
+            results[kind]['clients'] = len(group)
+        results['commits'] = _branch_commits(server.repo) - commits_before
+        results['github_calls'] = sum(server.calls.values()) - calls_before
+        results['seconds'] = duration
+        print(f"{worker_class}: {results['save'].get('throughput_per_second', 0):.1f} saves/s, "
+              f"{results['list'].get('throughput_per_second', 0):.1f} lists/s, "
+              f"list p95 {results['list'].get('latency_ms', {}).get('p95', 0):.0f} ms", file=sys.stderr)
+        return results
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        server.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--worker-classes', default='sync,gevent',
+                        help='Comma-separated gunicorn worker classes to compare')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--save-fraction', type=float, default=0.5,
+                        help='Share of the clients saving posts; the rest list them')
+    parser.add_argument('--think', type=float, default=0.1, help='Seconds each client waits between requests')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per worker class')
+    parser.add_argument('--posts', type=int, default=200, help='Synthetic posts to generate')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds added to every fake GitHub request')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    report = {
+        'created': datetime.now().isoformat(),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'clients': args.clients,
+            'save_fraction': args.save_fraction,
+            'think_seconds': args.think,
+            'duration_seconds': args.duration,
+            'posts': args.posts,
+            'latency_seconds': args.latency,
+            'seed': args.seed
+        },
+        'worker_classes': {
+            worker_class: run_worker_class(args, worker_class)
+            for worker_class in args.worker_classes.split(',')
+        }
+    }
+    data = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(data + '\n')
+    else:
+        print(data)
+
+if __name__ == '__main__':
+    main()
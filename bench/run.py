@@ -0,0 +1,317 @@
+"""
+Benchmarks for the CMS hot paths.
+
+Generates a synthetic blog (posts and images) under a temporary BLOG_PATH,
+starts the in-memory fake GitHub API (or, with --backend git, makes BLOG_PATH a
+clone of a local bare repository) and times each operation, reporting
+latency percentiles, throughput, peak memory and GitHub calls as JSON so
+runs before and after a change can be compared.
+
+Usage: python -m bench.run --posts 2000 --images 20 --iterations 50 --output before.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+import subprocess
+from datetime import datetime, timedelta
+from bench.fake_github import start_fake_github
+
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+    'incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud '
+    'exercitation ullamco laboris nisi aliquip ex ea commodo consequat'
+).split()
+CATEGORIES = ['travel', 'code', 'books', 'music', 'photography', 'notes']
+TAGS = ['python', 'flask', 'git', 'jekyll', 'design', 'linux', 'hiking', 'film', 'review', 'howto']
+
+def _paragraphs(rng, count):
+    return '\n\n'.join(' '.join(rng.choices(WORDS, k=rng.randint(40, 120))) for _ in range(count))
+
+def generate_blog(blog_path, posts, images, image_size=(1600, 1200), seed=0):
+    """Write a synthetic Jekyll blog with the given number of posts and images."""
+    import frontmatter
+    from PIL import Image
+    rng = random.Random(seed)
+    posts_path = os.path.join(blog_path, '_posts')
+    images_path = os.path.join(blog_path, 'assets', 'images')
+    os.makedirs(posts_path, exist_ok=True)
+    os.makedirs(images_path, exist_ok=True)
+
+    start = datetime(2015, 1, 1)
+    for i in range(posts):
+        date = start + timedelta(hours=rng.randint(0, 24 * 365 * 10))
+        post = frontmatter.Post(
+            _paragraphs(rng, rng.randint(3, 12)),
+            title=f"{' '.join(rng.choices(WORDS, k=4)).title()} {i}",
+            date=date,
+            categories=rng.sample(CATEGORIES, rng.randint(1, 2)),
+            tags=rng.sample(TAGS, rng.randint(0, 4))
+        )
+        with open(os.path.join(posts_path, f"{date:%Y-%m-%d}-post-{i}.md"), 'w', encoding='utf-8') as f:
+            f.write(frontmatter.dumps(post))
+
+    for i in range(images):
+        # Noise over a gradient compresses like a photo rather than a flat fill
+        noise = Image.effect_noise(image_size, 64).convert('RGB')
+        gradient = Image.linear_gradient('L').resize(image_size).convert('RGB')
+        img = Image.blend(noise, gradient, 0.5)
+        img.save(os.path.join(images_path, f"image-{i}.jpg"), 'JPEG', quality=90)
+
+def init_git_checkout(root, blog_path):
+    """Make blog_path a checkout whose origin is a bare repository under root."""
+    bare_path = os.path.join(root, 'site.git')
+    subprocess.run(['git', 'init', '-q', '--bare', '-b', 'main', bare_path], check=True)
+    subprocess.run(['git', 'init', '-q', '-b', 'main', blog_path], check=True)
+    subprocess.run(['git', 'remote', 'add', 'origin', bare_path], cwd=blog_path, check=True)
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+class Bench:
+    """Runs operations, collecting timings, memory and fake GitHub call counts."""
+    def __init__(self, server, iterations, warmup):
+        self.server = server
+        self.iterations = iterations
+        self.warmup = warmup
+        self.results = {}
+
+    def measure(self, name, operation, setup=None, iterations=None, warmup=None):
+        """
+        Time operation() over the iterations, calling setup() untimed before each run.
+        Latencies are measured without tracing; one extra traced run records the
+        peak Python heap use, since tracemalloc slows allocation-heavy code down.
+        """
+        iterations = iterations or self.iterations
+        warmup = self.warmup if warmup is None else warmup
+        for _ in range(warmup):
+            if setup:
+                setup()
+            operation()
+
+        calls_before = sum(self.server.calls.values())
+        samples = []
+        for _ in range(iterations):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            operation()
+            samples.append(time.perf_counter() - started)
+        calls = sum(self.server.calls.values()) - calls_before
+
+        if setup:
+            setup()
+        tracemalloc.start()
+        operation()
+        peak_traced = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        total = sum(samples)
+        self.results[name] = {
+            'iterations': iterations,
+            'total_seconds': total,
+            'throughput_per_second': iterations / total if total else None,
+            'latency_ms': {
+                'min': min(samples) * 1000,
+                'mean': total / iterations * 1000,
+                'p50': _percentile(samples, 0.50) * 1000,
+                'p90': _percentile(samples, 0.90) * 1000,
+                'p95': _percentile(samples, 0.95) * 1000,
+                'p99': _percentile(samples, 0.99) * 1000,
+                'max': max(samples) * 1000
+            },
+            'peak_traced_bytes': peak_traced,
+            'max_rss_bytes': _max_rss_bytes(),
+            'github_calls_per_iteration': calls / iterations
+        }
+        print(f"{name}: p50 {self.results[name]['latency_ms']['p50']:.2f} ms, "
+              f"p99 {self.results[name]['latency_ms']['p99']:.2f} ms", file=sys.stderr)
+
+def _max_rss_bytes():
+    """High-water mark of the process RSS (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(args):
+    root = tempfile.mkdtemp(prefix='cms-bench-')
+    blog_path = os.path.join(root, 'blog')
+    os.makedirs(blog_path)
+    server = start_fake_github(latency=args.latency)
+    if args.backend == 'git':
+        init_git_checkout(root, blog_path)
+    # Config is read at import time, so the environment must be in place first
+    os.environ.update(
+        BLOG_PATH=blog_path,
+        GITHUB_TOKEN='bench',
+        GITHUB_USERNAME=server.repo.owner,
+        GITHUB_REPO=server.repo.name,
+        GITHUB_API_URL=server.url,
+        ADMIN_USERNAME='bench',
+        ADMIN_PASSWORD='bench',
+        COMMIT_DEBOUNCE_SECONDS='3600',
+        STORAGE_BACKEND=args.backend
+    )
+    try:
+        started = time.perf_counter()
+        generate_blog(blog_path, args.posts, args.images, seed=args.seed)
+        generate_seconds = time.perf_counter() - started
+
+        import frontmatter
+        from app import create_app
+        from app.commit_queue import commit_queue
+        from app.fileio import content_version
+        from app.post_index import PostIndex
+        from app.images import optimize_image
+        from app.utils import commit_and_push_changes, sync_images, push_paths, delete_from_github
+        from config.config import Config
+
+        bench = Bench(server, args.iterations, args.warmup)
+        rng = random.Random(args.seed)
+        post_files = sorted(os.listdir(Config.POSTS_PATH))
+
+        # Listing: a cold index build from the files, then warm (cached) listings
+        cold_index_file = os.path.join(Config.CMS_STATE_PATH, 'bench_cold_index.json')
+        def cold_setup():
+            if os.path.exists(cold_index_file):
+                os.remove(cold_index_file)
+        bench.measure('post_index_cold_build',
+                      lambda: PostIndex(Config.POSTS_PATH, cold_index_file).posts(),
+                      setup=cold_setup, iterations=max(args.iterations // 10, 3), warmup=0)
+        from app.routes.posts import get_all_posts
+        bench.measure('get_all_posts', get_all_posts)
+
+        # Frontmatter serialization, as done by new_post and edit_post
+        sample = frontmatter.Post(_paragraphs(rng, 8), title='Benchmark post', date=datetime.now(),
+                                  categories=['code'], tags=['python', 'flask'])
+        bench.measure('frontmatter_dumps', lambda: frontmatter.dumps(sample))
+        with open(os.path.join(Config.POSTS_PATH, post_files[0]), 'r', encoding='utf-8') as f:
+            sample_text = f.read()
+        bench.measure('frontmatter_loads', lambda: frontmatter.loads(sample_text))
+
+        # The post routes end to end; commits are queued (and pushed afterwards)
+        app = create_app()
+        client = app.test_client()
+        client.post('/login', data={'username': 'bench', 'password': 'bench'})
+        counter = iter(range(10 ** 9))
+        def new_post():
+            response = client.post('/posts/new', data={
+                'title': f'Bench new {next(counter)}',
+                'content': _paragraphs(rng, 6),
+                'categories': 'code, notes',
+                'tags': 'python'
+            })
+            assert response.status_code == 302, response.status_code
+        bench.measure('new_post', new_post)
+        def edit_post():
+            filename = rng.choice(post_files)
+            response = client.post(f'/posts/{filename}/edit', data={
+                'title': f'Bench edit {next(counter)}',
+                'content': _paragraphs(rng, 6),
+                'categories': 'code',
+                'tags': 'python, git',
+                'version': content_version(os.path.join(Config.POSTS_PATH, filename))
+            })
+            assert response.status_code == 302, response.status_code
+        bench.measure('edit_post', edit_post)
+        commit_queue.flush()
+
+        # Commit paths against the fake GitHub API
+        bench.measure('initial_sync', commit_and_push_changes, iterations=1, warmup=0)
+        bench.measure('commit_and_push_changes_unchanged', commit_and_push_changes)
+        def touch_post():
+            path = os.path.join(Config.POSTS_PATH, rng.choice(post_files))
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(f"\n{next(counter)}\n")
+            return os.path.relpath(path, Config.BLOG_PATH)
+        bench.measure('commit_and_push_changes_one_edit', commit_and_push_changes, setup=touch_post)
+        pending = []
+        bench.measure('push_paths_one_post',
+                      lambda: push_paths([pending.pop()], 'Benchmark update'),
+                      setup=lambda: pending.append(touch_post()))
+        deletable = [os.path.relpath(os.path.join(Config.POSTS_PATH, name), Config.BLOG_PATH)
+                     for name in post_files[-(args.iterations + args.warmup + 1):]]
+        def delete_setup():
+            path = deletable.pop()
+            os.remove(os.path.join(Config.BLOG_PATH, path))
+            pending.append(path)
+        bench.measure('delete_from_github_one_post',
+                      lambda: delete_from_github(pending.pop()), setup=delete_setup)
+
+        # Images: optimization in-process, then pushing them
+        image_files = sorted(os.listdir(Config.IMAGES_PATH))
+        if image_files:
+            output_dir = tempfile.mkdtemp(dir=blog_path)
+            bench.measure('optimize_image',
+                          lambda: optimize_image(os.path.join(Config.IMAGES_PATH, rng.choice(image_files)),
+                                                 os.path.join(output_dir, 'out.jpg')),
+                          iterations=min(args.iterations, max(len(image_files), 5)))
+            bench.measure('sync_images', sync_images, iterations=1, warmup=0)
+
+        return {
+            'created': datetime.now().isoformat(),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parameters': {
+                'posts': args.posts,
+                'images': args.images,
+                'backend': args.backend,
+                'iterations': args.iterations,
+                'warmup': args.warmup,
+                'latency_seconds': args.latency,
+                'seed': args.seed
+            },
+            'generate_seconds': generate_seconds,
+            'operations': bench.results,
+            'github_calls': dict(server.calls),
+            'storage': _storage_stats()
+        }
+    finally:
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+def _storage_stats():
+    from app.storage import storage
+    return storage.stats()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1000, help='Synthetic posts to generate')
+    parser.add_argument('--images', type=int, default=10, help='Synthetic images to generate')
+    parser.add_argument('--iterations', type=int, default=30, help='Timed runs per operation')
+    parser.add_argument('--warmup', type=int, default=2, help='Untimed runs before timing')
+    parser.add_argument('--backend', choices=('github', 'git'), default='github',
+                        help='Storage backend the commit paths go through')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every fake GitHub request')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated blog directory')
+    args = parser.parse_args()
+
+    report = run(args)
+    data = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(data + '\n')
+    else:
+        print(data)
+
+if __name__ == '__main__':
+    main()
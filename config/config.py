@@ -1,24 +1,135 @@
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
 
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev')
+    # Seed the first account only; later password changes go through `flask users set-password`
     ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin')
     ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'admin')
     BLOG_PATH = os.path.abspath(os.getenv('BLOG_PATH', '../blog'))
     GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
     GITHUB_USERNAME = os.getenv('GITHUB_USERNAME')
+    GITHUB_REPO = os.getenv('GITHUB_REPO', '89hardy.github.io')
+    GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+    GITHUB_POOL_SIZE = int(os.getenv('GITHUB_POOL_SIZE', '16'))
+    GITHUB_RETRIES = int(os.getenv('GITHUB_RETRIES', '3'))
+    GITHUB_LATENCY_SAMPLES = int(os.getenv('GITHUB_LATENCY_SAMPLES', '1000'))
+    GITHUB_BLOB_CONCURRENCY = int(os.getenv('GITHUB_BLOB_CONCURRENCY', '8'))
+    GITHUB_RATE_LIMIT_RETRIES = int(os.getenv('GITHUB_RATE_LIMIT_RETRIES', '3'))
+    GITHUB_MAX_BACKOFF_SECONDS = float(os.getenv('GITHUB_MAX_BACKOFF_SECONDS', '60'))
+    # Commits are rebuilt on the new head when another worker moved the branch first
+    GITHUB_REF_RETRIES = int(os.getenv('GITHUB_REF_RETRIES', '5'))
+    GITHUB_REF_RETRY_BASE_SECONDS = float(os.getenv('GITHUB_REF_RETRY_BASE_SECONDS', '0.25'))
+    
+    # Storage backend: 'github' (REST API) or 'git' (local checkout at BLOG_PATH, pushed to GIT_REMOTE)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'github').lower()
+    GIT_REMOTE = os.getenv('GIT_REMOTE', 'origin')
+    GIT_BRANCH = os.getenv('GIT_BRANCH') or None
+    GIT_PUSH = os.getenv('GIT_PUSH', 'true').lower() in ('1', 'true', 'yes')
+    GIT_PUSH_RETRIES = int(os.getenv('GIT_PUSH_RETRIES', '3'))
+    GIT_AUTHOR_NAME = os.getenv('GIT_AUTHOR_NAME', 'Blog CMS')
+    GIT_AUTHOR_EMAIL = os.getenv('GIT_AUTHOR_EMAIL', 'cms@localhost')
     
     # Derived paths
     POSTS_PATH = os.path.join(BLOG_PATH, '_posts')
     DRAFTS_PATH = os.path.join(BLOG_PATH, '_drafts')
     IMAGES_PATH = os.path.join(BLOG_PATH, 'assets/images')
     
+    # CMS state (indexes and caches) kept next to the blog checkout
+    CMS_STATE_PATH = os.path.join(BLOG_PATH, '.cms')
+    POST_INDEX_FILE = os.path.join(CMS_STATE_PATH, 'post_index.json')
+    SEARCH_DB_FILE = os.path.join(CMS_STATE_PATH, 'search.db')
+    
+    IMAGE_CATALOG_FILE = os.path.join(CMS_STATE_PATH, 'images.json')
+    BLOB_HASH_CACHE_FILE = os.path.join(CMS_STATE_PATH, 'blob_hashes.json')
+    JOBS_PATH = os.path.join(CMS_STATE_PATH, 'jobs')
+    LOCKS_PATH = os.path.join(CMS_STATE_PATH, 'locks')
+    
+    # Conditional GETs: write paths bump a generation per content type; rendered
+    # responses are cached per worker (0 disables the cache, ETags still apply)
+    GENERATIONS_PATH = os.path.join(CMS_STATE_PATH, 'generations')
+    RESPONSE_CACHE_ENTRIES = int(os.getenv('RESPONSE_CACHE_ENTRIES', '64'))
+    
+    # Background GitHub commits: changes made within the window share one commit
+    COMMIT_QUEUE_ENABLED = os.getenv('COMMIT_QUEUE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    COMMIT_DEBOUNCE_SECONDS = float(os.getenv('COMMIT_DEBOUNCE_SECONDS', '5'))
+    JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', '86400'))
+    
+    # Scheduled publishing: every interval, due drafts are moved to _posts in one commit
+    SCHEDULE_FILE = os.path.join(CMS_STATE_PATH, 'schedule.json')
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    SCHEDULER_INTERVAL_SECONDS = float(os.getenv('SCHEDULER_INTERVAL_SECONDS', '60'))
+    # Failed pushes of published drafts are retried with exponential backoff up to this delay
+    SCHEDULER_RETRY_MAX_SECONDS = float(os.getenv('SCHEDULER_RETRY_MAX_SECONDS', '3600'))
+    # IANA timezone editors enter publish times in; they are stored in UTC
+    SITE_TIMEZONE = os.getenv('SITE_TIMEZONE', 'UTC')
+    
+    # Upload limits; uploads are streamed to UPLOAD_TMP_PATH before they are accepted
+    UPLOAD_TMP_PATH = os.path.join(CMS_STATE_PATH, 'uploads')
+    MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(20 * 1024 * 1024)))
+    MAX_CONTENT_LENGTH = MAX_UPLOAD_BYTES + 64 * 1024
+    # Bulk imports stream the request body, so they get a larger limit of their own
+    MAX_IMPORT_BYTES = int(os.getenv('MAX_IMPORT_BYTES', str(1024 * 1024 * 1024)))
+    MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', str(50 * 1000 * 1000)))
+    UPLOAD_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF')
+    
+    # Image processing; originals are kept out of the published tree
+    IMAGE_ORIGINALS_PATH = os.path.join(CMS_STATE_PATH, 'originals')
+    IMAGE_SIZES = [int(size) for size in os.getenv('IMAGE_SIZES', '400,800,1600').split(',') if size.strip()]
+    IMAGE_MAX_SIZE = int(os.getenv('IMAGE_MAX_SIZE', '800'))
+    IMAGE_JPEG_QUALITY = int(os.getenv('IMAGE_JPEG_QUALITY', '85'))
+    IMAGE_MODERN_FORMATS = [fmt.strip().upper() for fmt in os.getenv('IMAGE_MODERN_FORMATS', 'webp,avif').split(',') if fmt.strip()]
+    IMAGE_ENCODER_SETTINGS = {
+        'JPEG': {'quality': IMAGE_JPEG_QUALITY, 'optimize': True, 'progressive': True},
+        'PNG': {'optimize': True},
+        'GIF': {'optimize': True},
+        'WEBP': {'quality': int(os.getenv('IMAGE_WEBP_QUALITY', '80')), 'method': 6},
+        'AVIF': {'quality': int(os.getenv('IMAGE_AVIF_QUALITY', '60')), 'speed': 6}
+    }
+    IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '0')) or None
+    
+    # Markdown previews
+    MARKDOWN_EXTENSIONS = ['extra', 'sane_lists']
+    PREVIEW_CACHE_ENTRIES = int(os.getenv('PREVIEW_CACHE_ENTRIES', '256'))
+    PREVIEW_CACHE_BYTES = int(os.getenv('PREVIEW_CACHE_BYTES', str(8 * 1024 * 1024)))
+    
+    # Post listing pagination
+    POSTS_PER_PAGE = int(os.getenv('POSTS_PER_PAGE', '20'))
+    MAX_POSTS_PER_PAGE = int(os.getenv('MAX_POSTS_PER_PAGE', '100'))
+    IMAGES_PER_PAGE = int(os.getenv('IMAGES_PER_PAGE', '50'))
+    MAX_IMAGES_PER_PAGE = int(os.getenv('MAX_IMAGES_PER_PAGE', '200'))
+    
+    # Static site rendering (flask site build); output is for previewing and checking the site locally
+    SITE_TITLE = os.getenv('SITE_TITLE', 'Blog')
+    SITE_URL = os.getenv('SITE_URL', '')
+    SITE_OUTPUT_PATH = os.path.abspath(os.getenv('SITE_OUTPUT_PATH', os.path.join(CMS_STATE_PATH, 'site')))
+    SITE_MANIFEST_FILE = os.path.join(CMS_STATE_PATH, 'site_manifest.json')
+    SITE_FEED_ENTRIES = int(os.getenv('SITE_FEED_ENTRIES', '20'))
+    SITE_WORKERS = int(os.getenv('SITE_WORKERS', '0')) or None
+    
+    # Accounts; the hash method carries its cost, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'
+    USERS_DB_FILE = os.path.join(CMS_STATE_PATH, 'users.db')
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    USER_CACHE_TTL_SECONDS = float(os.getenv('USER_CACHE_TTL_SECONDS', '60'))
+    # Failed logins allowed per window for one address and account, and for one address overall
+    LOGIN_MAX_ATTEMPTS = int(os.getenv('LOGIN_MAX_ATTEMPTS', '5'))
+    LOGIN_MAX_ATTEMPTS_PER_ADDRESS = int(os.getenv('LOGIN_MAX_ATTEMPTS_PER_ADDRESS', '20'))
+    LOGIN_WINDOW_SECONDS = int(os.getenv('LOGIN_WINDOW_SECONDS', '300'))
+    # Reverse proxies in front of the app whose X-Forwarded-* headers are trusted (1 on Render)
+    PROXY_FIX_HOPS = int(os.getenv('PROXY_FIX_HOPS', '0'))
+    
+    # Logging and metrics; /metrics also accepts this bearer token instead of a login
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.getenv('LOG_FORMAT', '%(asctime)s %(levelname)s %(name)s: %(message)s')
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    
     # Ensure directories exist
     @classmethod
     def init_app(cls):
         os.makedirs(cls.POSTS_PATH, exist_ok=True)
         os.makedirs(cls.DRAFTS_PATH, exist_ok=True)
-        os.makedirs(cls.IMAGES_PATH, exist_ok=True) 
\ No newline at end of file
+        os.makedirs(cls.IMAGES_PATH, exist_ok=True)
+        os.makedirs(cls.CMS_STATE_PATH, exist_ok=True)
+        os.makedirs(cls.JOBS_PATH, exist_ok=True)
+        os.makedirs(cls.LOCKS_PATH, exist_ok=True)
+        os.makedirs(cls.IMAGE_ORIGINALS_PATH, exist_ok=True)
+        os.makedirs(cls.UPLOAD_TMP_PATH, exist_ok=True) 
\ No newline at end of file
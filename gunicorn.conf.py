@@ -0,0 +1,21 @@
+# Gunicorn settings, read with `gunicorn -c gunicorn.conf.py wsgi:app`.
+# The default gevent workers serve many requests at once per process: GitHub
+# calls, pushes and subprocesses yield to other requests while they wait on
+# the network, so a push in flight does not hold up other editors.
+# Set GUNICORN_WORKER_CLASS=sync for one request per process.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+# Concurrent requests per gevent worker
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '200'))
+# Pushes of large changes can take a while against the GitHub API
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+# Workers import the app after gevent has patched the standard library
+preload_app = False
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
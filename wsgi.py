@@ -1,4 +1,9 @@
-from app import create_app
+from dotenv import load_dotenv
+
+# The config reads the environment when it is imported, so load .env first
+load_dotenv()
+
+from app import create_app  # noqa: E402
 
 app = create_app()
 